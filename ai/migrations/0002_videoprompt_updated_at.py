@@ -0,0 +1,18 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='videoprompt',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -17,6 +17,7 @@ class VideoPrompt(models.Model):
     finalVideo = models.URLField(blank=True, null=True)
     category = models.CharField(max_length=10, choices=CATEGORY_CHOICES, default='comedy')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
 
     def __str__(self):
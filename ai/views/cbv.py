@@ -10,6 +10,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 import base64
 from moviepy import VideoFileClip, concatenate_videoclips
 import uuid
@@ -22,6 +24,22 @@ import requests
 logger = logging.getLogger('api_logger')
 
 
+def _video_updated_at(request, pk):
+    # Looked up once per request and shared by the ETag and Last-Modified checks.
+    if not hasattr(request, '_video_updated_at'):
+        request._video_updated_at = VideoPrompt.objects.filter(id=pk).values_list('updated_at', flat=True).first()
+    return request._video_updated_at
+
+
+def video_etag(request, pk, *args, **kwargs):
+    updated_at = _video_updated_at(request, pk)
+    return f'video-{pk}-{updated_at.timestamp()}' if updated_at else None
+
+
+def video_last_modified(request, pk, *args, **kwargs):
+    return _video_updated_at(request, pk)
+
+
 class GenerateVideo(APIView):
     @swagger_auto_schema(
         operation_summary="Generate video from user prompt",
@@ -180,9 +198,11 @@ class VideoDetail(APIView):
         operation_summary="Retrieve a single video by ID",
         responses={
             200: VideoPromptSerializer,
+            304: "Not Modified",
             404: "Not Found"
         }
     )
+    @method_decorator(condition(etag_func=video_etag, last_modified_func=video_last_modified))
     def get(self, request, pk):
         logger.info(f"GET request to VideoDetail for ID {pk}.")
         try:
@@ -65,14 +65,16 @@ def dashboard(request):
     logger.info(f"Dashboard accessed by user {user.username}.")
 
     try:
-        posts = Post.objects.filter(author=user).annotate(
-            num_likes=Count('likes'),
-            num_comments=Count('comments')
-        )
+        posts = Post.objects.filter(author=user)
 
-        total_posts = posts.count()
-        avg_likes = posts.aggregate(avg_likes=Avg('num_likes'))['avg_likes'] or 0
-        avg_comments = posts.aggregate(avg_comments=Avg('num_comments'))['avg_comments'] or 0
+        totals = posts.aggregate(
+            total_posts=Count('id'),
+            avg_likes=Avg('like_count'),
+            avg_comments=Avg('comment_count'),
+        )
+        total_posts = totals['total_posts']
+        avg_likes = totals['avg_likes'] or 0
+        avg_comments = totals['avg_comments'] or 0
 
         logger.info(f"Total posts: {total_posts}, Avg likes: {avg_likes}, Avg comments: {avg_comments}")
 
@@ -100,7 +102,7 @@ def dashboard(request):
             'avg_comments': avg_comments,
             'bar_chart': bar_chart,
             'pie_chart': pie_chart,
-            'top_posts': posts.order_by('-num_likes')[:5],
+            'top_posts': posts.order_by('-like_count')[:5],
         }
 
         logger.info(f"Dashboard data prepared for user {user.username}.")
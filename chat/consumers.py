@@ -3,7 +3,9 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from .models import ChatRoom, Message
+from .unread import record_message, unread_state
 from django.contrib.auth.models import User
+from social_network.push import get_version, push_to_users, user_group
 import logging
 
 logger = logging.getLogger('chat_logger')
@@ -112,6 +114,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
             room=room,
             content=content
         )
+        recipient_ids = list(room.participants.exclude(id=user_id).values_list('id', flat=True))
+        record_message(room.id, recipient_ids)
+        push_to_users(recipient_ids, {'type': 'unread.changed', 'room_id': room.id, 'delta': 1})
         return {
             'id': message.id,
             'timestamp': message.timestamp.isoformat(),
@@ -128,4 +133,41 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'username': message.user.username,
                 'timestamp': message.timestamp.isoformat(),
             })
-        return result
\ No newline at end of file
+        return result
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Pushes a user's new notifications and unread-count changes to every open tab as
+    they happen. The first message is the current state; later ones are deltas.
+    """
+    async def connect(self):
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            await self.close()
+            return
+
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        logger.info(f"Notification stream connected: user={user.username}")
+
+        state = await self.get_state(user.id)
+        await self.send(text_data=json.dumps({'type': 'state', **state}))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notification_created(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    async def notification_read(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    async def unread_changed(self, event):
+        await self.send(text_data=json.dumps(event))
+
+    @database_sync_to_async
+    def get_state(self, user_id):
+        return {'version': get_version(user_id), **unread_state(user_id)}
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from chat.unread import REBUILD_BATCH_SIZE, rebuild_unread_counters
+
+
+class Command(BaseCommand):
+    help = "Reloads every user's unread message counters in Redis from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_unread_counters(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt unread counters for {rebuilt} users."))
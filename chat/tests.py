@@ -1,3 +1,139 @@
-from django.test import TestCase
+from unittest import mock
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.urls import reverse
+from social_network.push import get_version, push_to_users
+from social_network.testing import TestCase, TransactionTestCase
+from redis.exceptions import RedisError
+from . import unread
+from .consumers import NotificationConsumer
+from .models import ChatRoom, Message
 
-# Create your tests here.
+
+class NotificationConsumerTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+        communicator.scope['user'] = user
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def test_streams_state_then_pushed_changes(self):
+        user = await database_sync_to_async(User.objects.create_user)(username='ann', password='password123')
+        communicator, connected = await self.connect(user)
+        self.assertTrue(connected)
+
+        state = await communicator.receive_json_from()
+        self.assertEqual((state['type'], state['unread_count'], state['notifications_unread']), ('state', 0, 0))
+
+        await database_sync_to_async(push_to_users)([user.id], {'type': 'unread.changed', 'room_id': 1, 'delta': 1})
+        event = await communicator.receive_json_from()
+        self.assertEqual((event['type'], event['delta']), ('unread.changed', 1))
+        await communicator.disconnect()
+
+    async def test_rejects_anonymous_users(self):
+        communicator, connected = await self.connect(AnonymousUser())
+        self.assertFalse(connected)
+
+
+class PollUpdatesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ann', password='password123')
+        self.other = User.objects.create_user(username='ben', password='password123')
+        self.room = ChatRoom.objects.create(name='Chat between ann and ben')
+        self.room.participants.add(self.user, self.other)
+        Message.objects.create(user=self.other, room=self.room, content='Hi')
+        self.client.login(username='ann', password='password123')
+
+    def test_returns_state_when_version_is_stale(self):
+        response = self.client.get(reverse('poll_updates'), {'version': 'stale'})
+        self.assertEqual(response.json(), {'version': get_version(self.user.id), 'unread_count': 1, 'notifications_unread': 0})
+
+    def test_reading_a_room_moves_the_version_on(self):
+        version = get_version(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('room', args=[self.room.id]))
+        self.assertNotEqual(get_version(self.user.id), version)
+        self.assertEqual(self.client.get(reverse('unread_message_count')).json(), {'unread_count': 0})
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(username=name, password='password123') for name in ['ann', 'ben', 'cat']]
+        self.room = ChatRoom.objects.create(name='Group', type='group')
+        self.room.participants.add(*self.users)
+        self.other_room = ChatRoom.objects.create(name='Chat between ann and ben')
+        self.other_room.participants.add(*self.users[:2])
+
+    def send(self, user, room):
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(user=user, room=room, content='Hi')
+            unread.record_message(room.id, [u.id for u in room.participants.exclude(id=user.id)])
+
+    def test_counters_follow_messages_and_reads(self):
+        ann, ben, cat = self.users
+        self.assertEqual(unread.unread_message_count(ann.id), 0)
+        self.send(ben, self.room)
+        self.send(ben, self.other_room)
+        self.send(ann, self.room)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(unread.unread_message_count(ann.id), 2)
+        self.assertEqual(unread.unread_counts_by_room(ann.id), {self.room.id: 1, self.other_room.id: 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            unread.mark_room_read(ann.id, self.room.id)
+        self.assertEqual(unread.unread_counts_by_room(ann.id), {self.other_room.id: 1})
+        self.assertEqual(unread.unread_message_count(cat.id), 2)
+
+    def test_each_group_member_clears_their_own_counter(self):
+        ann, ben, cat = self.users
+        for user in (ann, cat):
+            unread.unread_message_count(user.id)
+        self.send(ben, self.room)
+
+        for user in (ann, cat):
+            self.client.login(username=user.username, password='password123')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get(reverse('room', args=[self.room.id]))
+            self.assertEqual(unread.unread_counts_by_room(user.id), {})
+            self.assertEqual(unread.unread_message_count(user.id), 0)
+
+    def test_message_committed_during_warm_up_is_not_lost(self):
+        ann, ben = self.users[:2]
+        load_counts = unread._load_counts
+
+        def load_then_send(user_ids):
+            counts = load_counts(user_ids)
+            self.send(ben, self.room)
+            return counts
+
+        with mock.patch('chat.unread._load_counts', side_effect=load_then_send):
+            self.assertEqual(unread.unread_message_count(ann.id), 0)
+        self.assertEqual(unread.unread_message_count(ann.id), 1)
+
+    def test_rebuild_matches_database(self):
+        ben = self.users[1]
+        Message.objects.create(user=ben, room=self.room, content='Hi')
+        Message.objects.create(user=ben, room=self.other_room, content='Hi')
+        self.assertEqual(unread.rebuild_unread_counters(batch_size=2), 3)
+        self.assertEqual(unread.unread_counts_by_room(self.users[0].id), {self.room.id: 1, self.other_room.id: 1})
+        self.assertEqual(unread.unread_message_count(ben.id), 0)
+
+    def test_falls_back_to_database_without_redis(self):
+        Message.objects.create(user=self.users[1], room=self.room, content='Hi')
+        with mock.patch('chat.unread.get_redis_connection', side_effect=RedisError):
+            self.assertEqual(unread.unread_message_count(self.users[0].id), 1)
+
+    def test_room_list_reads_counts_from_the_hash(self):
+        self.send(self.users[1], self.room)
+        self.client.login(username='ann', password='password123')
+        response = self.client.get(reverse('chat_rooms'))
+        counts = {room.id: room.unread_count for room in response.context['chat_rooms']}
+        self.assertEqual(counts, {self.room.id: 1, self.other_room.id: 0})
@@ -0,0 +1,231 @@
+import logging
+import uuid
+from collections import defaultdict
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from social_network.models import Notification
+from social_network.push import push_to_users
+from .models import Message
+
+logger = logging.getLogger('chat_logger')
+
+# Each user's hash holds the field 'total' and one field per room with unread
+# messages. A loaded hash always has 'total', so an absent key means "not loaded".
+TOTAL_FIELD = 'total'
+UNREAD_TTL = 60 * 60 * 24 * 7
+REBUILD_BATCH_SIZE = 1000
+
+# A warm-up registers a token under the user's warming key before it reads the
+# database. Updates that find the counters unloaded delete that key, since the
+# warm-up may have read the database before they committed; the counters are then
+# loaded only if the token is still there and the hash is still absent.
+_WARM_SCRIPT = """
+if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[2])
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+end
+redis.call('EXPIRE', KEYS[1], %d)
+return 1
+""" % UNREAD_TTL
+WARMING_TTL = 60
+
+# Only loaded hashes are updated; absent ones are built from the database on next use.
+_INCREMENT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[2])
+    return 0
+end
+redis.call('HINCRBY', KEYS[1], ARGV[1], 1)
+redis.call('HINCRBY', KEYS[1], '%s', 1)
+return 1
+""" % TOTAL_FIELD
+
+# Returns the number of messages that were unread in the room, or -1 if the
+# counters are not loaded.
+_MARK_READ_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('DEL', KEYS[2])
+    return -1
+end
+local unread = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if unread > 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('HINCRBY', KEYS[1], '%s', -unread)
+end
+return unread
+""" % TOTAL_FIELD
+
+
+def unread_key(user_id):
+    return f'unread:user:{user_id}'
+
+
+def warming_key(user_id):
+    return f'{unread_key(user_id)}:warming'
+
+
+def _load_counts(user_ids):
+    """
+    Returns {user_id: {room_id: unread messages}} from the database in one query.
+    """
+    counts = {user_id: defaultdict(int) for user_id in user_ids}
+    rows = (
+        Message.objects.filter(room__participants__in=user_ids, is_read=False)
+        .values_list('room__participants', 'room_id', 'user_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for participant_id, room_id, sender_id, total in rows:
+        # A user's own messages are never unread for them.
+        if participant_id != sender_id:
+            counts[participant_id][room_id] += total
+    return counts
+
+
+def _hash_mapping(room_counts):
+    return {TOTAL_FIELD: sum(room_counts.values()), **room_counts}
+
+
+def _read_counts(user_id):
+    conn = get_redis_connection('default')
+    counts = conn.hgetall(unread_key(user_id))
+    if counts:
+        return {field.decode(): int(value) for field, value in counts.items()}
+
+    token = uuid.uuid4().hex
+    conn.set(warming_key(user_id), token, ex=WARMING_TTL)
+    mapping = _hash_mapping(_load_counts([user_id])[user_id])
+    loaded = conn.eval(
+        _WARM_SCRIPT, 2, unread_key(user_id), warming_key(user_id),
+        token, *[item for pair in mapping.items() for item in pair],
+    )
+    if not loaded:
+        # A message or read committed meanwhile; the database is still right for
+        # this call, and the next one loads the counters again.
+        return {str(field): count for field, count in mapping.items()}
+    counts = conn.hgetall(unread_key(user_id))
+    return {field.decode(): int(value) for field, value in counts.items()}
+
+
+def unread_message_count(user_id):
+    """
+    Messages in the user's rooms, sent by others, that the user has not read yet,
+    read from the user's counter hash. Falls back to counting in the database if
+    Redis is unavailable.
+    """
+    try:
+        return max(_read_counts(user_id).get(TOTAL_FIELD, 0), 0)
+    except RedisError as e:
+        logger.error(f"Unread counters unavailable for user {user_id}, falling back to database: {e}")
+        return sum(_load_counts([user_id])[user_id].values())
+
+
+def unread_counts_by_room(user_id):
+    """
+    Returns {room_id: unread messages} for the user's rooms with unread messages.
+    """
+    try:
+        counts = _read_counts(user_id)
+        return {int(field): count for field, count in counts.items() if field != TOTAL_FIELD and count > 0}
+    except RedisError as e:
+        logger.error(f"Unread counters unavailable for user {user_id}, falling back to database: {e}")
+        return dict(_load_counts([user_id])[user_id])
+
+
+def _forget(user_ids):
+    try:
+        get_redis_connection('default').delete(
+            *[key for user_id in user_ids for key in (unread_key(user_id), warming_key(user_id))]
+        )
+    except RedisError as e:
+        logger.error(f"Could not invalidate unread counters for {len(user_ids)} users: {e}")
+
+
+def record_message(room_id, recipient_ids):
+    """
+    Counts a new message in `room_id` as unread for each recipient once the
+    surrounding transaction commits.
+    """
+    recipient_ids = list(recipient_ids)
+
+    def increment():
+        try:
+            conn = get_redis_connection('default')
+            with conn.pipeline(transaction=False) as pipe:
+                for user_id in recipient_ids:
+                    pipe.eval(_INCREMENT_SCRIPT, 2, unread_key(user_id), warming_key(user_id), room_id)
+                pipe.execute()
+        except RedisError as e:
+            # Stale counters would be wrong until they expire, so drop them instead.
+            logger.error(f"Could not update unread counters, invalidating {len(recipient_ids)} users: {e}")
+            _forget(recipient_ids)
+
+    if recipient_ids:
+        transaction.on_commit(increment)
+
+
+def mark_room_read(user_id, room_id, marked=0):
+    """
+    Resets the user's counter for `room_id` once the surrounding transaction commits,
+    and pushes the change to the user's connections. Call it whenever the user opens
+    the room: Message.is_read is shared by all participants, so in a group room the
+    database may report nothing newly read although this user's counter is not zero.
+    `marked`, the messages the caller marked read, is pushed instead when the
+    counters are not loaded.
+    """
+    def reset():
+        try:
+            unread = get_redis_connection('default').eval(
+                _MARK_READ_SCRIPT, 2, unread_key(user_id), warming_key(user_id), room_id,
+            )
+        except RedisError as e:
+            logger.error(f"Could not reset unread counter of user {user_id} in room {room_id}: {e}")
+            _forget([user_id])
+            unread = -1
+        if unread < 0:
+            unread = marked
+        if unread:
+            push_to_users([user_id], {'type': 'unread.changed', 'room_id': room_id, 'delta': -unread})
+
+    transaction.on_commit(reset)
+
+
+def rebuild_unread_counters(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Reloads every user's counter hash from the database, a batch of users per
+    query and pipeline. Returns the number of users rebuilt.
+    """
+    conn = get_redis_connection('default')
+    last_id = 0
+    rebuilt = 0
+    while True:
+        user_ids = list(User.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not user_ids:
+            break
+        last_id = user_ids[-1]
+
+        with conn.pipeline() as pipe:
+            for user_id, room_counts in _load_counts(user_ids).items():
+                key = unread_key(user_id)
+                pipe.delete(key)
+                pipe.hset(key, mapping=_hash_mapping(room_counts))
+                pipe.expire(key, UNREAD_TTL)
+            pipe.execute()
+        rebuilt += len(user_ids)
+    return rebuilt
+
+
+def unread_state(user_id):
+    """
+    The badge counts a client starts from before applying pushed deltas.
+    """
+    return {
+        'unread_count': unread_message_count(user_id),
+        'notifications_unread': Notification.objects.filter(recipient_id=user_id, read=False).count(),
+    }
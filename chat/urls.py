@@ -7,6 +7,7 @@ urlpatterns = [
     path('create/private/<int:friend_id>/', views.create_private_chat, name='create_private_chat'),
     path('create/group/', views.create_group_chat, name='create_group_chat'),
     path('unread/count/', views.unread_message_count, name='unread_message_count'),
+    path('updates/poll/', views.poll_updates, name='poll_updates'),
 ]
 
 from django.conf import settings
@@ -1,29 +1,31 @@
+import asyncio
 import logging
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, Http404
 from django.contrib.auth.models import User
 from django.db.models import Q
 from .models import ChatRoom, Message
+from .unread import mark_room_read, unread_counts_by_room, unread_message_count as get_unread_message_count, unread_state
 from social_network.models import Profile
+from social_network.push import get_version, user_group
 
 logger = logging.getLogger('chat_logger')
 
+LONG_POLL_TIMEOUT = 25
+
 @login_required
 def chat_rooms(request):
     """Show all chat rooms for the current user"""
     user = request.user
     chat_rooms = ChatRoom.objects.filter(participants=user).order_by('-created_at')
     
-    # Calculate unread message count for each room
+    # Unread message count for each room, from the user's counters
+    unread_counts = unread_counts_by_room(user.id)
     for room in chat_rooms:
-        room.unread_count = Message.objects.filter(
-            room=room
-        ).exclude(
-            user=user
-        ).filter(
-            is_read=False
-        ).count()
+        room.unread_count = unread_counts.get(room.id, 0)
     
     return render(request, 'chat/rooms.html', {
         'chat_rooms': chat_rooms
@@ -39,7 +41,8 @@ def room(request, room_id):
         return redirect('chat_rooms')
         
     # Mark messages as read
-    Message.objects.filter(room=room).exclude(user=request.user).update(is_read=True)
+    marked = Message.objects.filter(room=room, is_read=False).exclude(user=request.user).update(is_read=True)
+    mark_room_read(request.user.id, room.id, marked)
     
     # Get room messages
     messages = Message.objects.filter(room=room).order_by('timestamp')
@@ -141,12 +144,32 @@ def create_group_chat(request):
 @login_required
 def unread_message_count(request):
     """Get count of unread messages for the current user"""
-    unread_count = Message.objects.filter(
-        room__participants=request.user
-    ).exclude(
-        user=request.user
-    ).filter(
-        is_read=False
-    ).count()
-    
-    return JsonResponse({'unread_count': unread_count})
\ No newline at end of file
+    return JsonResponse({'unread_count': get_unread_message_count(request.user.id)})
+
+
+async def poll_updates(request):
+    """
+    Long-poll fallback for clients without WebSockets. Answers at once with the
+    current counts if the user's version has moved past ?version=, otherwise waits
+    up to LONG_POLL_TIMEOUT seconds for the next push first.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required'}, status=401)
+
+    version = request.GET.get('version')
+    if version is not None and str(await sync_to_async(get_version)(user.id)) == version:
+        channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(user_group(user.id), channel)
+        try:
+            # A push may have landed before the channel joined the group.
+            if str(await sync_to_async(get_version)(user.id)) == version:
+                await asyncio.wait_for(channel_layer.receive(channel), timeout=LONG_POLL_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            await channel_layer.group_discard(user_group(user.id), channel)
+
+    state = await sync_to_async(unread_state)(user.id)
+    return JsonResponse({'version': await sync_to_async(get_version)(user.id), **state})
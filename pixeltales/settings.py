@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    'django.contrib.postgres',
     'daphne',
     'django.contrib.staticfiles',
     'rest_framework',
@@ -254,6 +255,29 @@ CELERY_BROKER_URL = f'redis://{REDIS_HOST}:{REDIS_PORT}/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-post-counters': {
+        'task': 'social_network.tasks.reconcile_post_counters',
+        'schedule': timedelta(hours=1),
+    },
+    'reconcile-profile-summaries': {
+        'task': 'social_network.tasks.reconcile_profile_summaries',
+        'schedule': timedelta(hours=1),
+    },
+    'flush-pending-likes': {
+        'task': 'social_network.tasks.flush_pending_likes',
+        'schedule': timedelta(seconds=10),
+    },
+    'drain-notification-outbox': {
+        'task': 'social_network.tasks.drain_notification_outbox',
+        'schedule': timedelta(seconds=15),
+    },
+    'compute-friend-suggestions': {
+        'task': 'social_network.tasks.compute_friend_suggestions',
+        'schedule': timedelta(hours=6),
+    },
+}
+
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
         'Bearer': {
@@ -0,0 +1,34 @@
+import logging
+from django.db import transaction
+from .caching import POSTS_GENERATION, bump_generation
+from .models import Post
+from .profile_summary import adjust_summaries
+from .tasks import fanout_posts
+
+logger = logging.getLogger('api_logger')
+
+BULK_BATCH_SIZE = 500
+# Largest number of posts accepted by one bulk API call.
+MAX_BULK_POSTS = 500
+
+
+def create_posts(posts, batch_size=BULK_BATCH_SIZE):
+    """
+    Inserts unsaved Post instances with bulk_create, one statement per batch; the
+    database trigger fills in their search vectors. Bulk inserts send no post_save
+    signals, so the cached post lists and authors' post counts are updated and
+    fan-out is queued here, once for the whole call.
+    """
+    created = []
+    with transaction.atomic():
+        for start in range(0, len(posts), batch_size):
+            created.extend(Post.objects.bulk_create(posts[start:start + batch_size]))
+
+        if created:
+            post_ids = [post.pk for post in created]
+            bump_generation(POSTS_GENERATION)
+            adjust_summaries([post.author_id for post in created], posts=1)
+            transaction.on_commit(lambda: fanout_posts.delay(post_ids))
+
+    logger.info(f"Bulk-created {len(created)} posts.")
+    return created
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+import time
+from functools import wraps
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+from .fragments import get_versions, version_key
+from .models import Post
+
+logger = logging.getLogger('api_logger')
+
+POSTS_GENERATION = 'posts'
+RESPONSE_CACHE_TIMEOUT = 60 * 5
+
+
+def generation_key(name):
+    return f'generation:{name}'
+
+
+def get_generation(name):
+    key = generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        # Time-based, so a lost counter never reuses a generation seen before.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(name):
+    """
+    Invalidates everything cached under the generation. Bumped again once the
+    surrounding transaction commits, so a read racing the commit cannot cache
+    pre-commit data under the new generation.
+    """
+    def bump():
+        try:
+            cache.incr(generation_key(name))
+        except ValueError:
+            cache.set(generation_key(name), time.time_ns(), timeout=None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def response_cache_key(request, view_name, generation):
+    query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    user_id = request.user.pk if request.user.is_authenticated else 'anon'
+    return f'api_response:{view_name}:{generation}:{user_id}:{query}'
+
+
+def cached_response(generation_name, timeout=RESPONSE_CACHE_TIMEOUT, overlay=None):
+    """
+    Caches successful GET responses of a DRF function view per user and query string.
+    Entries are keyed by the current generation, so bumping it invalidates them all
+    at once; other methods always reach the view. `overlay`, if given, refreshes
+    fast-changing parts of the data in place on every successful read, so they need
+    not bump the generation.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            key = response_cache_key(request, view.__name__, get_generation(generation_name))
+            data = cache.get(key)
+            if data is not None:
+                return Response(overlay(data) if overlay else data, status=status.HTTP_200_OK)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data, timeout=timeout)
+                if overlay:
+                    overlay(response.data)
+            return response
+        return wrapper
+    return decorator
+
+
+def notifications_generation(user_id):
+    return f'notifications:{user_id}'
+
+
+def post_etag(request, post_id, *args, **kwargs):
+    """
+    ETag for a post and its comments, from the version bumped whenever either changes.
+    Versions are only created for posts that exist, so probing ids cannot grow the
+    cache; for other ids there is no ETag and the view answers 404.
+    """
+    version = cache.get(version_key(post_id))
+    if version is None:
+        if not Post.objects.filter(pk=post_id).exists():
+            return None
+        version = get_versions([post_id])[post_id]
+    return f'post-{post_id}-{version}'
+
+
+def notifications_etag(request, *args, **kwargs):
+    if not request.user.is_authenticated:
+        return None
+    generation = get_generation(notifications_generation(request.user.pk))
+    return f'notifications-{request.user.pk}-{generation}'
@@ -0,0 +1,286 @@
+import logging
+from collections import defaultdict
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from . import likes
+from .models import Comment, Post, Profile
+from .pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
+
+logger = logging.getLogger('feed_logger')
+
+# Number of post ids kept per materialized timeline.
+TIMELINE_LENGTH = 800
+# Authors with more friends than this are not fanned out on write; their posts are
+# merged into readers' timelines at read time instead.
+FANOUT_LIMIT = 5000
+FANOUT_BATCH_SIZE = 1000
+# Number of latest comments rendered inline on each post card.
+COMMENT_PREVIEW_SIZE = 3
+
+LARGE_ACCOUNTS_KEY = 'feed:large_accounts'
+
+
+def timeline_key(user_id):
+    return f'feed:timeline:{user_id}'
+
+
+def _score(created_at):
+    return created_at.timestamp()
+
+
+def get_follower_ids(author_id):
+    """
+    Ids of users who see `author_id`'s posts in their timeline: everyone who has the
+    author in their friends list.
+    """
+    return list(Profile.objects.filter(friends__user_id=author_id).values_list('user_id', flat=True))
+
+
+def get_friend_user_ids(user_id):
+    return list(Profile.objects.filter(user_friends__user_id=user_id).values_list('user_id', flat=True))
+
+
+def push_to_timelines(user_ids, entries):
+    """
+    Adds {post_id: score} entries to the timelines of `user_ids`, trimming each one to
+    TIMELINE_LENGTH. Timelines that are not materialized yet are left alone; they are
+    rebuilt from the database on first read.
+    """
+    conn = get_redis_connection('default')
+    for start in range(0, len(user_ids), FANOUT_BATCH_SIZE):
+        batch = user_ids[start:start + FANOUT_BATCH_SIZE]
+        with conn.pipeline(transaction=False) as pipe:
+            for user_id in batch:
+                pipe.exists(timeline_key(user_id))
+            materialized = pipe.execute()
+
+        with conn.pipeline(transaction=False) as pipe:
+            for user_id, exists in zip(batch, materialized):
+                if not exists:
+                    continue
+                key = timeline_key(user_id)
+                pipe.zadd(key, entries)
+                pipe.zremrangebyrank(key, 0, -TIMELINE_LENGTH - 1)
+            pipe.execute()
+
+
+def _fanout_author_posts(author_id, entries):
+    follower_ids = get_follower_ids(author_id)
+    conn = get_redis_connection('default')
+
+    if len(follower_ids) > FANOUT_LIMIT:
+        conn.sadd(LARGE_ACCOUNTS_KEY, author_id)
+        push_to_timelines([author_id], entries)
+        logger.info(f"{len(entries)} posts by large account {author_id} left for fan-out-on-read.")
+        return 1
+
+    conn.srem(LARGE_ACCOUNTS_KEY, author_id)
+    recipients = [author_id] + follower_ids
+    push_to_timelines(recipients, entries)
+    logger.info(f"{len(entries)} posts by {author_id} fanned out to {len(recipients)} timelines.")
+    return len(recipients)
+
+
+def fanout_post(post):
+    """
+    Fan-out-on-write: pushes a new post into its author's and their friends'
+    timelines. Large accounts only update their own timeline and are marked for
+    fan-out-on-read.
+    """
+    return _fanout_author_posts(post.author_id, {post.id: _score(post.created_at)})
+
+
+def fanout_posts(posts):
+    """
+    Fans out a batch of new posts with one timeline update per author rather than
+    one per post. Returns the number of timelines written.
+    """
+    entries_by_author = defaultdict(dict)
+    for post in posts:
+        entries_by_author[post.author_id][post.id] = _score(post.created_at)
+    return sum(_fanout_author_posts(author_id, entries) for author_id, entries in entries_by_author.items())
+
+
+def add_author_to_timeline(user_id, author_id):
+    """
+    Backfills a timeline with an author's recent posts, e.g. after a new friendship.
+    """
+    posts = Post.objects.filter(author_id=author_id).order_by('-created_at', '-id')[:TIMELINE_LENGTH]
+    entries = {pk: _score(created_at) for pk, created_at in posts.values_list('id', 'created_at')}
+    if entries:
+        push_to_timelines([user_id], entries)
+
+
+def remove_author_from_timeline(user_id, author_id):
+    """
+    Removes an author's posts from a timeline, e.g. after an unfriending. A timeline
+    holds at most TIMELINE_LENGTH posts, so only the author's newest ones can be in it.
+    """
+    conn = get_redis_connection('default')
+    posts = Post.objects.filter(author_id=author_id).order_by('-created_at', '-id')[:TIMELINE_LENGTH]
+    post_ids = list(posts.values_list('id', flat=True))
+    if post_ids:
+        conn.zrem(timeline_key(user_id), *post_ids)
+
+
+def rebuild_timeline(user_id):
+    """
+    Materializes a timeline from the database (fan-out-on-read for a cold cache).
+    """
+    author_ids = [user_id] + get_friend_user_ids(user_id)
+    posts = Post.objects.filter(author_id__in=author_ids).order_by('-created_at', '-id')[:TIMELINE_LENGTH]
+    entries = {pk: _score(created_at) for pk, created_at in posts.values_list('id', 'created_at')}
+
+    conn = get_redis_connection('default')
+    key = timeline_key(user_id)
+    with conn.pipeline() as pipe:
+        pipe.delete(key)
+        if entries:
+            pipe.zadd(key, entries)
+        else:
+            # Keep an empty marker so an empty timeline is not rebuilt on every read.
+            pipe.zadd(key, {0: 0})
+        pipe.execute()
+    return key
+
+
+def _read_timeline(user_id, before, limit):
+    """
+    Reads up to `limit` (post_id, score) entries that come after `before`, a
+    (created_at, id) cursor position, in (score, id) order. Posts that share the
+    boundary score are kept when their id is below the cursor's.
+    """
+    conn = get_redis_connection('default')
+    key = timeline_key(user_id)
+    if not conn.exists(key):
+        rebuild_timeline(user_id)
+    if before is None:
+        entries = conn.zrevrangebyscore(key, '+inf', '(0', start=0, num=limit, withscores=True)
+        return [(int(member), score) for member, score in entries]
+
+    max_score, max_pk = _score(before[0]), before[1]
+    with conn.pipeline(transaction=False) as pipe:
+        pipe.zrangebyscore(key, max_score, max_score, withscores=True)
+        pipe.zrevrangebyscore(key, f'({max_score}', '(0', start=0, num=limit, withscores=True)
+        ties, older = pipe.execute()
+    entries = [(int(member), score) for member, score in ties if int(member) < max_pk]
+    return entries + [(int(member), score) for member, score in older]
+
+
+def _older_than(posts, before):
+    if before is None:
+        return posts
+    created_at, pk = before
+    return posts.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+
+def _read_large_accounts(user_id, before, limit):
+    conn = get_redis_connection('default')
+    large_accounts = {int(member) for member in conn.smembers(LARGE_ACCOUNTS_KEY)}
+    if not large_accounts:
+        return []
+    author_ids = large_accounts.intersection(get_friend_user_ids(user_id))
+    if not author_ids:
+        return []
+    posts = _older_than(Post.objects.filter(author_id__in=author_ids), before)
+    posts = posts.order_by('-created_at', '-id').values_list('id', 'created_at')[:limit]
+    return [(pk, _score(created_at)) for pk, created_at in posts]
+
+
+def _read_from_db(user_id, before, limit):
+    author_ids = [user_id] + get_friend_user_ids(user_id)
+    posts = _older_than(Post.objects.filter(author_id__in=author_ids), before)
+    posts = posts.order_by('-created_at', '-id').values_list('id', 'created_at')[:limit]
+    return [(pk, _score(created_at)) for pk, created_at in posts]
+
+
+def get_home_feed(user, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    Returns (posts, next_cursor) for a user's home timeline. Only one page of post
+    ids is read from Redis, so the cost depends on page size rather than on the
+    number of posts in the system. Falls back to querying the database if Redis is
+    unavailable.
+    """
+    before = decode_cursor(cursor) if cursor else None
+    limit = page_size + 1
+
+    try:
+        entries = _read_timeline(user.id, before, limit)
+        entries += _read_large_accounts(user.id, before, limit)
+    except RedisError as e:
+        logger.error(f"Timeline read failed for user {user.id}, falling back to database: {e}")
+        entries = _read_from_db(user.id, before, limit)
+
+    entries = sorted(set(entries), key=lambda entry: (entry[1], entry[0]), reverse=True)[:limit]
+    post_ids = [pk for pk, _ in entries]
+    posts_by_id = Post.objects.for_feed().in_bulk(post_ids[:page_size])
+    posts = [posts_by_id[pk] for pk in post_ids[:page_size] if pk in posts_by_id]
+
+    next_cursor = None
+    if len(entries) > page_size and posts:
+        next_cursor = encode_cursor(posts[-1].created_at, posts[-1].pk)
+    return posts, next_cursor
+
+
+def prefetch_comments(posts, limit=COMMENT_PREVIEW_SIZE):
+    """
+    Attaches `comment_list` to each post: its latest `limit` comments, oldest first,
+    with the authors' profiles joined. One query ranks comments per post with
+    ROW_NUMBER, so popular posts cost no more than quiet ones. `comment_cursor`
+    points at the comments before the preview, or is None if there are none.
+    """
+    post_ids = [post.id for post in posts]
+    comments_by_post = defaultdict(list)
+    if post_ids:
+        comments = Comment.objects.filter(post_id__in=post_ids).annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('post_id'),
+                order_by=[F('created_at').desc(), F('id').desc()],
+            ),
+        ).filter(row_number__lte=limit).select_related('author__profile')
+        for comment in comments:
+            comments_by_post[comment.post_id].append(comment)
+
+    for post in posts:
+        post.comment_list = sorted(comments_by_post[post.id], key=lambda comment: (comment.created_at, comment.id))
+        post.comment_cursor = None
+        if post.comment_list and post.comment_count > len(post.comment_list):
+            oldest = post.comment_list[0]
+            post.comment_cursor = encode_cursor(oldest.created_at, oldest.id)
+    return posts
+
+
+def resolve_viewer_likes(posts, viewer):
+    """
+    Sets `liked_by_viewer` on each post with one membership query on the likes table,
+    overlaid with like changes still buffered in Redis.
+    """
+    post_ids = [post.id for post in posts]
+    if not post_ids:
+        return posts
+    liked_ids = set(
+        Post.likes.through.objects.filter(user_id=viewer.id, post_id__in=post_ids).values_list('post_id', flat=True)
+    )
+    try:
+        pending_liked, live_totals = likes.viewer_like_state(post_ids, viewer.id)
+    except RedisError as e:
+        logger.error(f"Could not read buffered likes for user {viewer.id}: {e}")
+        pending_liked, live_totals = {}, {}
+
+    for post in posts:
+        post.liked_by_viewer = pending_liked.get(post.id, post.id in liked_ids)
+        post.like_count = live_totals.get(post.id, post.like_count)
+    return posts
+
+
+def build_feed_context(posts, viewer):
+    """
+    Resolves everything a page of post cards needs in a fixed number of queries:
+    comments with their authors' profiles, and whether `viewer` liked each post.
+    Posts are expected to come from Post.objects.for_feed().
+    """
+    posts = list(posts)
+    return resolve_viewer_likes(prefetch_comments(posts), viewer)
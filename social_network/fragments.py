@@ -0,0 +1,104 @@
+import logging
+import re
+import time
+from django.core.cache import cache
+from django.template.backends.utils import csrf_input
+from django.template.loader import render_to_string
+from django.utils.dateparse import parse_datetime
+from django.utils.safestring import mark_safe
+from django.utils.timesince import timesince
+from . import feed
+
+logger = logging.getLogger('feed_logger')
+
+CARD_TEMPLATE = 'post_card.html'
+# Versions invalidate fragments on change; the timeout only bounds staleness of data
+# the version does not track, such as the author's avatar.
+FRAGMENT_TIMEOUT = 60 * 60
+# Version keys are written per post, so they expire rather than pile up for posts
+# nobody reads any more. A lost version is simply replaced by a fresh one.
+VERSION_TIMEOUT = 60 * 60 * 24 * 30
+
+_SLOT_RE = re.compile(r'<!--slot:(\w+)(?::([^>]*?))?-->')
+_OWNER_RE = re.compile(r'<!--owner-->.*?<!--/owner-->', re.S)
+_LIKED_ICON = '<i class="bi bi-heart-fill text-danger"></i>'
+_NOT_LIKED_ICON = '<i class="bi bi-heart"></i>'
+
+
+def version_key(post_id):
+    return f'post_version:{post_id}'
+
+
+def fragment_key(post_id, version):
+    return f'post_card:{post_id}:{version}'
+
+
+def _new_version():
+    # Time-based, so a version key lost from the cache never reuses an old number.
+    return time.time_ns()
+
+
+def get_versions(post_ids):
+    keys = {version_key(post_id): post_id for post_id in post_ids}
+    found = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, timeout=VERSION_TIMEOUT)
+        found.update(missing)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def bump_versions(post_ids):
+    for post_id in post_ids:
+        key = version_key(post_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), timeout=VERSION_TIMEOUT)
+
+
+def forget_version(post_id):
+    cache.delete(version_key(post_id))
+
+
+def _fill(html, post, request, csrf):
+    if post.author_id != request.user.id:
+        html = _OWNER_RE.sub('', html)
+
+    def replace(match):
+        name, value = match.groups()
+        if name == 'liked':
+            return _LIKED_ICON if post.liked_by_viewer else _NOT_LIKED_ICON
+        if name == 'csrf':
+            return csrf
+        if name == 'since':
+            return timesince(parse_datetime(value))
+        return ''
+
+    return mark_safe(_SLOT_RE.sub(replace, html))
+
+
+def render_post_cards(posts, request):
+    """
+    Returns the HTML of each post card. The shared part of a card is cached per post
+    version and only rendered on a miss; the viewer's like state, owner controls,
+    CSRF tokens and relative times are filled in per request.
+    """
+    posts = feed.resolve_viewer_likes(list(posts), request.user)
+    if not posts:
+        return []
+
+    versions = get_versions([post.id for post in posts])
+    keys = {post.id: fragment_key(post.id, versions[post.id]) for post in posts}
+    cached = cache.get_many(keys.values())
+
+    misses = [post for post in posts if keys[post.id] not in cached]
+    if misses:
+        feed.prefetch_comments(misses)
+        rendered = {keys[post.id]: render_to_string(CARD_TEMPLATE, {'post': post}) for post in misses}
+        cache.set_many(rendered, timeout=FRAGMENT_TIMEOUT)
+        cached.update(rendered)
+        logger.debug(f"Rendered {len(misses)} of {len(posts)} post cards.")
+
+    csrf = csrf_input(request)
+    return [_fill(cached[keys[post.id]], post, request, csrf) for post in posts]
@@ -0,0 +1,87 @@
+import logging
+from django.db import transaction
+from django.db.models import Q
+from .models import FriendRequest, Profile
+from .profile_summary import adjust_summaries
+from .signals import friend_request_accepted
+
+logger = logging.getLogger('api_logger')
+
+MAX_BULK_FRIEND_OPERATIONS = 500
+
+
+def _delete_requests(requests):
+    """
+    Deletes the requests with one statement and lowers their recipients' pending
+    counts with one adjust_summaries call. A plain delete() would load every row to
+    run the per-row post_delete receiver, costing an UPDATE per request.
+    """
+    recipient_ids = list(requests.filter(is_accepted=False).values_list('to_user_id', flat=True))
+    requests._raw_delete(requests.db)
+    adjust_summaries(recipient_ids, pending_requests=-1)
+
+
+def accept_friend_requests(user, request_ids):
+    """
+    Accepts the given requests received by `user` in one transaction: both directions
+    of every friendship are inserted with one through-table insert each, the requests
+    are deleted with one statement, and one friend_request_accepted signal covers the
+    batch. Returns the ids of the requests that were accepted.
+    """
+    with transaction.atomic():
+        pending = list(
+            FriendRequest.objects.select_for_update()
+            .filter(pk__in=request_ids, to_user=user)
+            .values_list('id', 'from_user_id')
+        )
+        if not pending:
+            return []
+        accepted_ids = [request_id for request_id, _ in pending]
+        from_user_ids = [from_user_id for _, from_user_id in pending]
+
+        profile_ids = list(Profile.objects.filter(user_id__in=from_user_ids).values_list('id', flat=True))
+        profile = user.profile
+        profile.friends.add(*profile_ids)
+        profile.user_friends.add(*profile_ids)
+        _delete_requests(FriendRequest.objects.filter(pk__in=accepted_ids))
+
+        friend_request_accepted.send(sender=FriendRequest, from_user_ids=from_user_ids, to_user=user)
+
+    logger.info(f"User {user.username} accepted {len(accepted_ids)} friend requests.")
+    return accepted_ids
+
+
+def reject_friend_requests(user, request_ids):
+    """
+    Deletes the given requests received by `user` with one statement. Returns the ids
+    of the requests that were rejected.
+    """
+    with transaction.atomic():
+        rejected_ids = list(FriendRequest.objects.filter(pk__in=request_ids, to_user=user).values_list('id', flat=True))
+        _delete_requests(FriendRequest.objects.filter(pk__in=rejected_ids))
+
+    logger.info(f"User {user.username} rejected {len(rejected_ids)} friend requests.")
+    return rejected_ids
+
+
+def remove_friends(user, profile_ids):
+    """
+    Ends the friendships between `user` and the given profiles in one transaction,
+    removing both directions and any requests between them in bulk. Returns the ids
+    of the profiles that were friends.
+    """
+    profile = user.profile
+    with transaction.atomic():
+        friend_ids = list(profile.friends.filter(pk__in=profile_ids).values_list('id', flat=True))
+        if not friend_ids:
+            return []
+        friend_user_ids = list(Profile.objects.filter(pk__in=friend_ids).values_list('user_id', flat=True))
+
+        profile.friends.remove(*friend_ids)
+        profile.user_friends.remove(*friend_ids)
+        _delete_requests(FriendRequest.objects.filter(
+            Q(from_user=user, to_user_id__in=friend_user_ids) | Q(to_user=user, from_user_id__in=friend_user_ids)
+        ))
+
+    logger.info(f"User {user.username} removed {len(friend_ids)} friends.")
+    return friend_ids
@@ -0,0 +1,262 @@
+import logging
+import time
+import uuid
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from .models import Profile
+
+logger = logging.getLogger('api_logger')
+
+# Friend sets hold this placeholder member so that a profile with no friends still
+# has a loaded set; it is never a real profile id.
+SENTINEL = 0
+FRIENDS_TTL = 60 * 60 * 24 * 7
+REBUILD_BATCH_SIZE = 1000
+MAX_MUTUAL_TARGETS = 100
+MAX_CONNECTION_DEPTH = 6
+CONNECTION_TIME_BUDGET = 0.2
+# Members added per SADD when a friend set is loaded.
+WARM_CHUNK_SIZE = 1000
+
+# Returns 1 or 0 for membership, or -1 when the friend set has not been loaded yet.
+_CHECK_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+return redis.call('SISMEMBER', KEYS[1], ARGV[1])
+"""
+
+
+def friends_key(profile_id):
+    return f'friends:profile:{profile_id}'
+
+
+def _load_friend_ids(profile_id):
+    return list(Profile.friends.through.objects.filter(from_profile_id=profile_id).values_list('to_profile_id', flat=True))
+
+
+def _install(pipe, profile_id, friend_ids):
+    """
+    Queues loading a friend set on `pipe`. The members are added in chunks under a
+    temporary key, which RENAMENX moves into place only if the set is still absent.
+    """
+    key = friends_key(profile_id)
+    temp_key = f'{key}:warming:{uuid.uuid4().hex}'
+    members = [SENTINEL, *friend_ids]
+    for start in range(0, len(members), WARM_CHUNK_SIZE):
+        pipe.sadd(temp_key, *members[start:start + WARM_CHUNK_SIZE])
+    pipe.expire(temp_key, FRIENDS_TTL)
+    pipe.renamenx(temp_key, key)
+    # A no-op after a successful rename; otherwise drops the copy that lost the race.
+    pipe.delete(temp_key)
+
+
+def warm_friends(profile_id):
+    conn = get_redis_connection('default')
+    with conn.pipeline(transaction=False) as pipe:
+        _install(pipe, profile_id, _load_friend_ids(profile_id))
+        pipe.execute()
+
+
+def is_friend(profile_id, friend_profile_id):
+    """
+    Whether `friend_profile_id` is in the friends list of `profile_id`, answered from
+    the cached friend set. Falls back to the database if Redis is unavailable.
+    """
+    try:
+        conn = get_redis_connection('default')
+        key = friends_key(profile_id)
+        member = conn.eval(_CHECK_SCRIPT, 1, key, friend_profile_id)
+        if member == -1:
+            warm_friends(profile_id)
+            member = conn.sismember(key, friend_profile_id)
+        return bool(member)
+    except RedisError as e:
+        logger.error(f"Friend cache unavailable for profile {profile_id}, falling back to database: {e}")
+        return Profile.friends.through.objects.filter(from_profile_id=profile_id, to_profile_id=friend_profile_id).exists()
+
+
+def _load_friend_ids_many(profile_ids):
+    friend_ids = {profile_id: set() for profile_id in profile_ids}
+    rows = Profile.friends.through.objects.filter(from_profile_id__in=profile_ids).values_list('from_profile_id', 'to_profile_id')
+    for profile_id, friend_id in rows:
+        friend_ids[profile_id].add(friend_id)
+    return friend_ids
+
+
+def _ensure_loaded(conn, profile_ids):
+    """
+    Loads the friend sets of `profile_ids` that are not cached yet, with one database
+    query for all of them.
+    """
+    with conn.pipeline(transaction=False) as pipe:
+        for profile_id in profile_ids:
+            pipe.exists(friends_key(profile_id))
+        loaded = pipe.execute()
+    missing = [profile_id for profile_id, exists in zip(profile_ids, loaded) if not exists]
+    if not missing:
+        return
+    with conn.pipeline(transaction=False) as pipe:
+        for profile_id, friend_ids in _load_friend_ids_many(missing).items():
+            _install(pipe, profile_id, friend_ids)
+        pipe.execute()
+
+
+def get_friend_ids_many(profile_ids):
+    """
+    Returns {profile_id: set of friend profile ids} in one round trip for cached sets.
+    """
+    profile_ids = list(profile_ids)
+    try:
+        conn = get_redis_connection('default')
+        _ensure_loaded(conn, profile_ids)
+        with conn.pipeline(transaction=False) as pipe:
+            for profile_id in profile_ids:
+                pipe.smembers(friends_key(profile_id))
+            members = pipe.execute()
+        return {
+            profile_id: {int(member) for member in friend_ids} - {SENTINEL}
+            for profile_id, friend_ids in zip(profile_ids, members)
+        }
+    except RedisError as e:
+        logger.error(f"Friend cache unavailable for {len(profile_ids)} profiles, falling back to database: {e}")
+        return _load_friend_ids_many(profile_ids)
+
+
+def mutual_friend_counts(profile_id, target_ids):
+    """
+    Returns {target_id: number of friends shared with `profile_id`}, intersecting the
+    cached friend sets in Redis in one pipelined round trip.
+    """
+    target_ids = list(target_ids)
+    if not target_ids:
+        return {}
+    try:
+        conn = get_redis_connection('default')
+        _ensure_loaded(conn, [profile_id] + target_ids)
+        with conn.pipeline(transaction=False) as pipe:
+            for target_id in target_ids:
+                pipe.sinter(friends_key(profile_id), friends_key(target_id))
+            shared = pipe.execute()
+        # Both sets hold the sentinel, so it is always in the intersection.
+        return {target_id: len(members) - 1 for target_id, members in zip(target_ids, shared)}
+    except RedisError as e:
+        logger.error(f"Friend cache unavailable for profile {profile_id}, falling back to database: {e}")
+        friends = Profile.friends.through.objects.filter(from_profile_id=profile_id).values('to_profile_id')
+        counts = dict(
+            Profile.friends.through.objects.filter(from_profile_id__in=target_ids, to_profile_id__in=friends)
+            .values('from_profile_id').annotate(total=Count('*')).values_list('from_profile_id', 'total')
+        )
+        return {target_id: counts.get(target_id, 0) for target_id in target_ids}
+
+
+def _path_to(parents, node):
+    path = []
+    while node is not None:
+        path.append(node)
+        node = parents[node]
+    return path
+
+
+def connection_path(source_id, target_id, max_depth=MAX_CONNECTION_DEPTH, time_budget=CONNECTION_TIME_BUDGET):
+    """
+    Finds a shortest chain of friends from `source_id` to `target_id` with a
+    bidirectional breadth-first search over the cached friend sets, expanding the
+    smaller frontier one level at a time with one batched fetch per level.
+    Friendships are mutual, so both searches follow the same edges.
+
+    Returns (path, exhausted): the profile ids from source to target, or None when
+    no path was found. `exhausted` is True if the search stopped at `max_depth` or
+    ran out of `time_budget` seconds before it could rule a path out.
+    """
+    if source_id == target_id:
+        return [source_id], False
+
+    deadline = time.monotonic() + time_budget
+    forward, backward = {source_id: None}, {target_id: None}
+    forward_frontier, backward_frontier = {source_id}, {target_id}
+    depth = 0
+
+    while forward_frontier and backward_frontier:
+        if depth >= max_depth or time.monotonic() > deadline:
+            return None, True
+        depth += 1
+
+        expand_forward = len(forward_frontier) <= len(backward_frontier)
+        frontier = forward_frontier if expand_forward else backward_frontier
+        seen, other = (forward, backward) if expand_forward else (backward, forward)
+
+        next_frontier = set()
+        for node, friend_ids in get_friend_ids_many(frontier).items():
+            for friend_id in friend_ids:
+                if friend_id in seen:
+                    continue
+                seen[friend_id] = node
+                if friend_id in other:
+                    path = _path_to(forward, friend_id)[::-1] + _path_to(backward, friend_id)[1:]
+                    return path, False
+                next_frontier.add(friend_id)
+
+        if expand_forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+
+    return None, False
+
+
+def record_friendships(pairs):
+    """
+    Drops the cached friend sets changed by (profile_id, friend_profile_id)
+    additions or removals once the surrounding transaction commits; they are
+    reloaded on next use. Editing a set in place would keep one installed by a
+    warm-up that read the database before the commit; dropping it does not.
+    """
+    profile_ids = {profile_id for profile_id, _ in pairs}
+    if profile_ids:
+        transaction.on_commit(lambda: forget_friends(profile_ids))
+
+
+def forget_friends(profile_ids):
+    keys = [friends_key(profile_id) for profile_id in profile_ids]
+    if not keys:
+        return
+    try:
+        get_redis_connection('default').delete(*keys)
+    except RedisError as e:
+        logger.error(f"Could not invalidate friend cache for {len(keys)} profiles: {e}")
+
+
+def rebuild_friend_sets(batch_size=REBUILD_BATCH_SIZE):
+    """
+    Reloads the friend set of every profile from the database, a batch of profiles
+    per pipeline. Returns the number of profiles rebuilt.
+    """
+    conn = get_redis_connection('default')
+    last_id = 0
+    rebuilt = 0
+    while True:
+        profile_ids = list(
+            Profile.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not profile_ids:
+            break
+        last_id = profile_ids[-1]
+
+        friend_ids = defaultdict(list)
+        rows = Profile.friends.through.objects.filter(from_profile_id__in=profile_ids).values_list('from_profile_id', 'to_profile_id')
+        for profile_id, friend_id in rows:
+            friend_ids[profile_id].append(friend_id)
+
+        with conn.pipeline() as pipe:
+            for profile_id in profile_ids:
+                key = friends_key(profile_id)
+                pipe.delete(key)
+                pipe.sadd(key, SENTINEL, *friend_ids[profile_id])
+                pipe.expire(key, FRIENDS_TTL)
+            pipe.execute()
+        rebuilt += len(profile_ids)
+    return rebuilt
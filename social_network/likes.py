@@ -0,0 +1,217 @@
+import logging
+import uuid
+from collections import defaultdict
+from django.contrib.auth.models import User
+from django.db import transaction
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError, ResponseError
+from . import fragments
+from .models import Post
+from .profile_summary import adjust_summaries
+
+logger = logging.getLogger('likes_logger')
+
+# Liker sets hold this placeholder member so that a post with no likes still has a
+# loaded set; it is never a real user id.
+SENTINEL = 0
+LIKERS_TTL = 60 * 60 * 24 * 7
+PENDING_KEY = 'likes:pending'
+FLUSHING_KEY = 'likes:pending:flushing'
+FLUSH_BATCH_SIZE = 1000
+# Members added per SADD when a liker set is loaded.
+WARM_CHUNK_SIZE = 1000
+
+# Returns {liked, count}, or {-1} when the liker set has not been loaded yet.
+_TOGGLE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {-1}
+end
+local liked
+if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then
+    redis.call('SREM', KEYS[1], ARGV[1])
+    liked = 0
+else
+    redis.call('SADD', KEYS[1], ARGV[1])
+    liked = 1
+end
+redis.call('HSET', KEYS[2], ARGV[2], liked)
+redis.call('EXPIRE', KEYS[1], %d)
+return {liked, redis.call('SCARD', KEYS[1]) - 1}
+""" % LIKERS_TTL
+
+
+def likers_key(post_id):
+    return f'likes:post:{post_id}'
+
+
+def _pending_field(post_id, user_id):
+    return f'{post_id}:{user_id}'
+
+
+def warm_likers(post_id):
+    """
+    Loads a post's liker set from the database. The set is built in chunks under a
+    temporary key and moved into place with RENAMENX, so it is only installed if
+    absent: a concurrent warm-up cannot resurrect a like that was toggled off after
+    the database was read.
+    """
+    conn = get_redis_connection('default')
+    key = likers_key(post_id)
+    members = [SENTINEL, *Post.likes.through.objects.filter(post_id=post_id).values_list('user_id', flat=True)]
+    temp_key = f'{key}:warming:{uuid.uuid4().hex}'
+    with conn.pipeline(transaction=False) as pipe:
+        for start in range(0, len(members), WARM_CHUNK_SIZE):
+            pipe.sadd(temp_key, *members[start:start + WARM_CHUNK_SIZE])
+        pipe.expire(temp_key, LIKERS_TTL)
+        pipe.execute()
+    if not conn.renamenx(temp_key, key):
+        conn.delete(temp_key)
+
+
+def toggle_like(post_id, user_id):
+    """
+    Flips a user's like on a post with one atomic Redis call and returns
+    (liked, total_likes). The change is queued and persisted by flush_pending_likes.
+    """
+    conn = get_redis_connection('default')
+    keys = [likers_key(post_id), PENDING_KEY]
+    args = [user_id, _pending_field(post_id, user_id)]
+    result = conn.eval(_TOGGLE_SCRIPT, len(keys), *keys, *args)
+    if result[0] == -1:
+        warm_likers(post_id)
+        result = conn.eval(_TOGGLE_SCRIPT, len(keys), *keys, *args)
+    return bool(result[0]), result[1]
+
+
+def toggle_like_in_db(post, user):
+    """
+    Flips a user's like directly in the database, for when Redis cannot take the
+    toggle. Returns (liked, total_likes).
+    """
+    liked = not post.likes.filter(pk=user.pk).exists()
+    if liked:
+        post.likes.add(user)
+    else:
+        post.likes.remove(user)
+    try:
+        forget_post(post.pk)
+    except RedisError as e:
+        logger.error(f"Could not drop liker set of post {post.pk}: {e}")
+    return liked, Post.objects.values_list('like_count', flat=True).get(pk=post.pk)
+
+
+def viewer_like_state(post_ids, user_id):
+    """
+    Returns ({post_id: liked}, {post_id: total_likes}) for changes that are still
+    buffered in Redis, so pages rendered before the next flush reflect them. Posts
+    without buffered state are absent from the dicts.
+    """
+    conn = get_redis_connection('default')
+    fields = [_pending_field(post_id, user_id) for post_id in post_ids]
+    with conn.pipeline(transaction=False) as pipe:
+        pipe.hmget(FLUSHING_KEY, fields)
+        pipe.hmget(PENDING_KEY, fields)
+        for post_id in post_ids:
+            pipe.scard(likers_key(post_id))
+        flushing, pending, *counts = pipe.execute()
+
+    liked = {}
+    for post_id, before, after in zip(post_ids, flushing, pending):
+        state = after if after is not None else before
+        if state is not None:
+            liked[post_id] = bool(int(state))
+    totals = {post_id: count - 1 for post_id, count in zip(post_ids, counts) if count}
+    return liked, totals
+
+
+def live_like_counts(post_ids):
+    """
+    Returns {post_id: total_likes} for the posts whose liker set is loaded, which
+    includes every post liked or unliked since its count was last flushed.
+    """
+    conn = get_redis_connection('default')
+    with conn.pipeline(transaction=False) as pipe:
+        for post_id in post_ids:
+            pipe.scard(likers_key(post_id))
+        counts = pipe.execute()
+    return {post_id: count - 1 for post_id, count in zip(post_ids, counts) if count}
+
+
+def forget_post(post_id):
+    get_redis_connection('default').delete(likers_key(post_id))
+
+
+def _claim_pending(conn):
+    """
+    Moves the pending hash aside so toggles arriving during the flush start a new one.
+    A batch left over from a failed flush is retried first.
+    """
+    if conn.exists(FLUSHING_KEY):
+        return conn.hgetall(FLUSHING_KEY)
+    try:
+        conn.rename(PENDING_KEY, FLUSHING_KEY)
+    except ResponseError:
+        # Nothing pending.
+        return {}
+    return conn.hgetall(FLUSHING_KEY)
+
+
+def flush_pending_likes():
+    """
+    Write-behind: persists queued like toggles to the Post.likes through table with
+    bulk inserts/deletes, then copies the current counts onto Post.like_count.
+    """
+    conn = get_redis_connection('default')
+    pending = _claim_pending(conn)
+    if not pending:
+        return 0
+
+    added, removed = [], defaultdict(list)
+    for field, liked in pending.items():
+        post_id, user_id = map(int, field.decode().split(':'))
+        if int(liked):
+            added.append((post_id, user_id))
+        else:
+            removed[post_id].append(user_id)
+
+    post_ids = {post_id for post_id, _ in added} | set(removed)
+    stored = {pk: (author_id, like_count) for pk, author_id, like_count
+              in Post.objects.filter(pk__in=post_ids).values_list('pk', 'author_id', 'like_count')}
+    existing_posts = set(stored)
+    existing_users = set(User.objects.filter(pk__in={user_id for _, user_id in added}).values_list('pk', flat=True))
+    Like = Post.likes.through
+
+    with conn.pipeline(transaction=False) as pipe:
+        for post_id in existing_posts:
+            pipe.scard(likers_key(post_id))
+        counts = dict(zip(existing_posts, pipe.execute()))
+
+    # Authors' likes received move by the same amount as their posts' counts.
+    new_counts, authors_by_change = {}, defaultdict(list)
+    for post_id, count in counts.items():
+        author_id, like_count = stored[post_id]
+        if count and count - 1 != like_count:
+            new_counts[post_id] = max(count - 1, 0)
+            authors_by_change[new_counts[post_id] - like_count].append(author_id)
+
+    with transaction.atomic():
+        Like.objects.bulk_create(
+            [Like(post_id=post_id, user_id=user_id) for post_id, user_id in added
+             if post_id in existing_posts and user_id in existing_users],
+            batch_size=FLUSH_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        for post_id, user_ids in removed.items():
+            Like.objects.filter(post_id=post_id, user_id__in=user_ids).delete()
+        Post.objects.bulk_update(
+            [Post(pk=post_id, like_count=like_count) for post_id, like_count in new_counts.items()],
+            ['like_count'],
+            batch_size=FLUSH_BATCH_SIZE,
+        )
+        for change, author_ids in authors_by_change.items():
+            adjust_summaries(author_ids, likes=change)
+
+    conn.delete(FLUSHING_KEY)
+    fragments.bump_versions(existing_posts)
+    logger.info(f"Flushed {len(pending)} like changes across {len(existing_posts)} posts.")
+    return len(pending)
@@ -0,0 +1,61 @@
+import json
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from social_network.bulk import BULK_BATCH_SIZE, create_posts
+from social_network.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports posts from a JSON Lines file, one {\"title\", \"content\", \"author\"} object "
+        "per line. Posts are inserted and indexed for search a batch at a time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON Lines file to import")
+        parser.add_argument('--author', help="Username used for lines without an author")
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        total = 0
+        try:
+            with open(options['path'], encoding='utf-8') as lines:
+                batch = []
+                for line_number, line in enumerate(lines, start=1):
+                    if not line.strip():
+                        continue
+                    batch.append((line_number, self._parse(line, line_number, options['author'])))
+                    if len(batch) >= batch_size:
+                        total += self._import(batch)
+                        batch = []
+                if batch:
+                    total += self._import(batch)
+        except OSError as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {total} posts."))
+
+    def _parse(self, line, line_number, default_author):
+        try:
+            data = json.loads(line)
+            title, content = data['title'], data['content']
+        except (ValueError, TypeError, KeyError):
+            raise CommandError(f"Line {line_number}: expected an object with a title and content.")
+        author = data.get('author') or default_author
+        if not author:
+            raise CommandError(f"Line {line_number}: no author given and no --author default.")
+        return title, content, author
+
+    def _import(self, batch):
+        usernames = {author for _, (_, _, author) in batch}
+        authors = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+        posts = []
+        for line_number, (title, content, author) in batch:
+            if author not in authors:
+                raise CommandError(f"Line {line_number}: unknown author {author!r}.")
+            posts.append(Post(title=title, content=content, author_id=authors[author]))
+
+        created = create_posts(posts)
+        self.stdout.write(f"Imported {len(created)} posts up to line {batch[-1][0]}.")
+        return len(created)
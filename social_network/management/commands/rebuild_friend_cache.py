@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from social_network.friends import REBUILD_BATCH_SIZE, rebuild_friend_sets
+
+
+class Command(BaseCommand):
+    help = "Reloads every profile's cached friend set in Redis from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_friend_sets(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt friend sets for {rebuilt} profiles."))
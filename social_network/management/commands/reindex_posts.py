@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from social_network.models import Post
+from social_network.search import SQLiteSearchBackend
+
+CHECKPOINT_KEY = 'reindex_posts:last_id'
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes post search vectors in id-ordered chunks, one short UPDATE per chunk. "
+        "Progress is checkpointed, so an interrupted run resumes where it stopped. "
+        "On SQLite, rebuilds the FTS5 index instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--missing-only', action='store_true',
+                            help="Only index posts that have no search vector yet")
+        parser.add_argument('--restart', action='store_true',
+                            help="Ignore the saved checkpoint and start from the first post")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            SQLiteSearchBackend().rebuild()
+            self.stdout.write(self.style.SUCCESS("Rebuilt the SQLite full-text index."))
+            return
+        if connection.vendor != 'postgresql':
+            self.stdout.write("Search vectors are only stored on PostgreSQL; nothing to do.")
+            return
+
+        chunk_size = max(1, options['chunk_size'])
+        posts = Post.objects.all()
+        if options['missing_only']:
+            posts = posts.filter(search_vector__isnull=True)
+
+        last_id = 0 if options['restart'] else cache.get(CHECKPOINT_KEY, 0)
+        if last_id:
+            self.stdout.write(f"Resuming after post {last_id}.")
+        remaining = posts.filter(pk__gt=last_id).count()
+        done = 0
+
+        while True:
+            ids = list(posts.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+            if not ids:
+                break
+            done += Post.objects.filter(pk__in=ids).update_search_vector()
+            last_id = ids[-1]
+            cache.set(CHECKPOINT_KEY, last_id, timeout=None)
+            self.stdout.write(f"Reindexed {done}/{remaining} posts (up to id {last_id}).")
+
+        cache.delete(CHECKPOINT_KEY)
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {done} posts."))
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:30
+
+from django.db import migrations
+
+# Full-text search is PostgreSQL-only; other databases skip these statements. The
+# GIN index is built without blocking writes by migration 0023.
+CREATE_SQL = """
+CREATE OR REPLACE FUNCTION social_network_post_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector(COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector(COALESCE(NEW.content, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER social_network_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, content ON social_network_post
+    FOR EACH ROW EXECUTE FUNCTION social_network_post_search_vector();
+"""
+
+DROP_SQL = """
+DROP TRIGGER IF EXISTS social_network_post_search_vector_trigger ON social_network_post;
+DROP FUNCTION IF EXISTS social_network_post_search_vector();
+"""
+
+
+def create_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_network', '0014_comment_post_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigger, drop_trigger),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.3 on 2026-10-18 18:50
+
+from django.db import migrations
+
+# SQLite keeps an FTS5 index of post titles and contents in sync through triggers;
+# other databases skip these statements.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS social_network_post_fts USING fts5(
+        title, content, content='social_network_post', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS social_network_post_fts_insert AFTER INSERT ON social_network_post BEGIN
+        INSERT INTO social_network_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS social_network_post_fts_delete AFTER DELETE ON social_network_post BEGIN
+        INSERT INTO social_network_post_fts(social_network_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS social_network_post_fts_update AFTER UPDATE OF title, content ON social_network_post BEGIN
+        INSERT INTO social_network_post_fts(social_network_post_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO social_network_post_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    "INSERT INTO social_network_post_fts(social_network_post_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS social_network_post_fts_update",
+    "DROP TRIGGER IF EXISTS social_network_post_fts_delete",
+    "DROP TRIGGER IF EXISTS social_network_post_fts_insert",
+    "DROP TABLE IF EXISTS social_network_post_fts",
+]
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in CREATE_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in DROP_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_network', '0015_post_search_vector_trigger'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.3 on 2026-10-18 19:10
+
+from django.conf import settings
+from django.db import migrations
+
+# Trigram indexes serve both the similarity operators and icontains, which
+# PostgreSQL compiles to UPPER(column::text) LIKE UPPER(pattern).
+CREATE_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS auth_user_username_trgm_idx ON auth_user USING gin (username gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS auth_user_username_upper_trgm_idx ON auth_user USING gin ((UPPER(username::text)) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS profile_bio_upper_trgm_idx ON social_network_profile USING gin ((UPPER(bio::text)) gin_trgm_ops)",
+]
+
+DROP_SQL = [
+    "DROP INDEX IF EXISTS profile_bio_upper_trgm_idx",
+    "DROP INDEX IF EXISTS auth_user_username_upper_trgm_idx",
+    "DROP INDEX IF EXISTS auth_user_username_trgm_idx",
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in CREATE_SQL:
+            schema_editor.execute(statement)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in DROP_SQL:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_network', '0016_post_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.1.3 on 2026-10-18 21:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_summaries(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    Post = apps.get_model('social_network', 'Post')
+    Profile = apps.get_model('social_network', 'Profile')
+    FriendRequest = apps.get_model('social_network', 'FriendRequest')
+    ProfileSummary = apps.get_model('social_network', 'ProfileSummary')
+
+    def count_subquery(queryset, field):
+        return Coalesce(Subquery(
+            queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('*')).values('total')
+        ), 0)
+
+    ProfileSummary.objects.bulk_create(
+        [ProfileSummary(user_id=user_id) for user_id in User.objects.values_list('id', flat=True).iterator()],
+        batch_size=1000,
+    )
+    ProfileSummary.objects.update(
+        post_count=count_subquery(Post.objects, 'author'),
+        friend_count=count_subquery(Profile.friends.through.objects, 'from_profile__user'),
+        likes_received=count_subquery(Post.likes.through.objects, 'post__author'),
+        pending_request_count=count_subquery(FriendRequest.objects.filter(is_accepted=False), 'to_user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_network', '0017_user_search_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('friend_count', models.PositiveIntegerField(default=0)),
+                ('likes_received', models.PositiveIntegerField(default=0)),
+                ('pending_request_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.3 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_network', '0020_notificationevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'read', '-timestamp', '-id'], name='notification_unread_page_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.3 on 2026-10-19 09:20
+
+from django.conf import settings
+from django.db import migrations
+
+# PostgreSQL searches usernames through the trigram indexes of 0017. Elsewhere
+# prefix searches are a range on LOWER(username), served by an expression index.
+CREATE_SQL = {
+    'sqlite': "CREATE INDEX IF NOT EXISTS auth_user_username_lower_idx ON auth_user (LOWER(username))",
+    'mysql': "CREATE INDEX auth_user_username_lower_idx ON auth_user ((LOWER(username)))",
+}
+
+DROP_SQL = {
+    'sqlite': "DROP INDEX IF EXISTS auth_user_username_lower_idx",
+    'mysql': "DROP INDEX auth_user_username_lower_idx ON auth_user",
+}
+
+
+def create_index(apps, schema_editor):
+    statement = CREATE_SQL.get(schema_editor.connection.vendor)
+    if statement:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    statement = DROP_SQL.get(schema_editor.connection.vendor)
+    if statement:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('social_network', '0021_notification_unread_page_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.3 on 2026-10-19 09:45
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations
+
+# Built concurrently so a large posts table stays writable meanwhile. IF NOT EXISTS
+# keeps this a no-op where an earlier version of 0015 already built the index.
+CREATE_SQL = (
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS post_search_vector_gin_idx "
+    "ON social_network_post USING gin (search_vector)"
+)
+DROP_SQL = "DROP INDEX CONCURRENTLY IF EXISTS post_search_vector_gin_idx"
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction.
+    atomic = False
+
+    dependencies = [
+        ('social_network', '0022_user_username_lower_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='post',
+                    index=GinIndex(fields=['search_vector'], name='post_search_vector_gin_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_index, drop_index),
+            ],
+        ),
+    ]
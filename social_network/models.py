@@ -2,16 +2,63 @@ import logging
 from django.contrib.auth.models import User, AbstractUser
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import connection, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
 from django.db.models.signals import post_save
 from ai.models import VideoPrompt
 from django import forms
 from django.dispatch import receiver
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.search import SearchVectorField, SearchVector
 
 logger = logging.getLogger('model_logger')
 
 
+def _count_subquery(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('*')).values('total')
+    ), 0)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """
+        Joins the author and profile, so a page of posts can be serialized without a
+        query per row. Like and comment counts are read from the denormalized columns.
+        """
+        return self.select_related('author__profile')
+
+    def with_actual_counts(self):
+        """
+        Annotates the like/comment counts computed from the source tables, for
+        reconciling the denormalized columns.
+        """
+        return self.annotate(
+            actual_like_count=_count_subquery(Post.likes.through.objects, 'post'),
+            actual_comment_count=_count_subquery(Comment.objects, 'post'),
+        )
+
+    def update_search_vector(self):
+        """
+        Recomputes the search vector of every matched post in one UPDATE, with the
+        same expression as the database trigger. Full-text search needs PostgreSQL,
+        so this is a no-op on other databases.
+        """
+        if connection.vendor != 'postgresql':
+            return 0
+        return self.update(search_vector=SearchVector('title', weight='A') + SearchVector('content', weight='B'))
+
+    def recount(self):
+        """
+        Overwrites the denormalized counters with values computed from the source tables.
+        """
+        return self.update(
+            like_count=_count_subquery(Post.likes.through.objects, 'post'),
+            comment_count=_count_subquery(Comment.objects, 'post'),
+        )
+
+
 class Post(models.Model):
     title = models.CharField(max_length=255)
     content = models.TextField()
@@ -19,20 +66,40 @@ class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     image = models.ImageField(default='default_post.jpg', upload_to='post_pics')
     likes = models.ManyToManyField(User, related_name='liked_posts', blank=True)
+    # Kept current by a database trigger on PostgreSQL (migration 0015).
     search_vector = SearchVectorField(null=True)
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         indexes = [
             models.Index(fields=['created_at']),
             models.Index(fields=['author']),
+            models.Index(fields=['-created_at', '-id'], name='post_created_id_idx'),
+            # Built only on PostgreSQL, concurrently (migration 0023).
+            GinIndex(fields=['search_vector'], name='post_search_vector_gin_idx'),
         ]
 
     def __str__(self):
         return self.title
 
     def total_likes(self):
-        return self.likes.count()
-    
+        return self.like_count
+
+    @classmethod
+    def adjust_counts(cls, post_ids, likes=0, comments=0):
+        """
+        Atomically shifts the denormalized counters of the given posts.
+        """
+        updates = {}
+        if likes:
+            updates['like_count'] = Greatest(F('like_count') + likes, 0)
+        if comments:
+            updates['comment_count'] = Greatest(F('comment_count') + comments, 0)
+        if updates:
+            cls.objects.filter(pk__in=post_ids).update(**updates)
 
 
 class PostForm(forms.ModelForm):
@@ -50,6 +117,11 @@ class Comment(models.Model):
     post = models.ForeignKey(Post, related_name='comments', on_delete=models.CASCADE)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='comments')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_created_id_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.author} on {self.post}"
 
@@ -75,20 +147,60 @@ class Profile(models.Model):
 
     def add_friend(self, profile):
         self.friends.add(profile)
-        self.save()
         logger.info(f"User {self.user.username} added {profile.user.username} as a friend.")
 
     def remove_friend(self, profile):
         self.friends.remove(profile)
-        self.save()
         logger.info(f"User {self.user.username} removed {profile.user.username} from friends.")
 
     def is_friend(self, profile):
-        is_friend = profile in self.friends.all()
+        from .friends import is_friend as cached_is_friend
+        is_friend = cached_is_friend(self.pk, profile.pk)
         logger.debug(f"Checked friendship status between {self.user.username} and {profile.user.username}: {is_friend}.")
         return is_friend
 
 
+class ProfileSummaryQuerySet(models.QuerySet):
+    def with_actual_counts(self):
+        """
+        Annotates the counters computed from the source tables, for reconciling the
+        stored values.
+        """
+        return self.annotate(**{f'actual_{field}': value for field, value in _summary_counts().items()})
+
+    def recount(self):
+        """
+        Overwrites the stored counters with values computed from the source tables.
+        """
+        return self.update(**_summary_counts())
+
+
+def _summary_counts():
+    return {
+        'post_count': _count_subquery(Post.objects, 'author'),
+        'friend_count': _count_subquery(Profile.friends.through.objects, 'from_profile__user'),
+        'likes_received': _count_subquery(Post.likes.through.objects, 'post__author'),
+        'pending_request_count': _count_subquery(FriendRequest.objects.filter(is_accepted=False), 'to_user'),
+    }
+
+
+class ProfileSummary(models.Model):
+    """
+    Counters shown on a user's profile page, kept current incrementally by signals
+    so the page does not count posts, friends and likes on every view.
+    """
+    user = models.OneToOneField(User, primary_key=True, related_name='profile_summary', on_delete=models.CASCADE)
+    post_count = models.PositiveIntegerField(default=0)
+    friend_count = models.PositiveIntegerField(default=0)
+    likes_received = models.PositiveIntegerField(default=0)
+    pending_request_count = models.PositiveIntegerField(default=0)
+
+    objects = ProfileSummaryQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.user.username} Profile summary'
+
+
 class ProfileForm(forms.ModelForm):
     class Meta:
         model = Profile
@@ -130,9 +242,48 @@ class Notification(models.Model):
     target = GenericForeignKey('target_content_type', 'target_object_id')
     timestamp = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
+    # Rolled-up notifications stand for several actors; `actor` is the most recent.
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['recipient', 'target_object_id', 'read'], name='notification_target_idx'),
+            models.Index(fields=['recipient', 'read', '-timestamp', '-id'], name='notification_unread_page_idx'),
+        ]
 
     def __str__(self):
         return f"Notification: {self.actor} {self.verb} to {self.recipient}"
+
+    @staticmethod
+    def describe(username, actor_count, verb):
+        """
+        E.g. "alice and 41 others liked your post".
+        """
+        others = actor_count - 1
+        if others < 1:
+            return f"{username} {verb}"
+        return f"{username} and {others} other{'s' if others > 1 else ''} {verb}"
+
+    @property
+    def message(self):
+        return self.describe(self.actor.username, self.actor_count, self.verb)
+
+
+class NotificationEvent(models.Model):
+    """
+    Transactional outbox for notifications: written in the transaction of the action
+    that causes it and turned into Notification rows in batches by a beat task.
+    """
+    recipient = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    actor = models.ForeignKey(User, related_name='+', on_delete=models.CASCADE)
+    verb = models.CharField(max_length=255)
+    target_content_type = models.ForeignKey(ContentType, blank=True, null=True, on_delete=models.CASCADE)
+    target_object_id = models.PositiveIntegerField(blank=True, null=True)
+    # Whether events for the same recipient, verb and target roll up into one notification.
+    aggregate = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Notification event: {self.actor_id} {self.verb} to {self.recipient_id}"
@@ -0,0 +1,191 @@
+import logging
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from .caching import bump_generation, notifications_generation
+from .models import Notification, NotificationEvent
+from .push import push_to_users
+
+logger = logging.getLogger('notifications')
+
+# Events drained together for the same recipient, verb and target become one
+# rolled-up notification, so the drain interval is the aggregation window.
+RECENT_ACTORS = 3
+OUTBOX_BATCH_SIZE = 500
+# Largest number of ids accepted by one "mark as read" call.
+MAX_BULK_NOTIFICATIONS = 500
+
+
+def _event(recipient_id, actor_id, verb, target, aggregate):
+    return NotificationEvent(
+        recipient_id=recipient_id,
+        actor_id=actor_id,
+        verb=verb,
+        target_content_type=ContentType.objects.get_for_model(target) if target is not None else None,
+        target_object_id=target.pk if target is not None else None,
+        aggregate=aggregate,
+    )
+
+
+def record_event(recipient_id, actor_id, verb, target=None, aggregate=False):
+    """
+    Writes "`actor_id` `verb` `target`" for `recipient_id` to the outbox, in the
+    caller's transaction. With `aggregate`, events for the same recipient, verb
+    and target roll up into one notification. Actions on one's own content are not
+    notified.
+    """
+    if recipient_id != actor_id:
+        _event(recipient_id, actor_id, verb, target, aggregate).save()
+
+
+def record_events(recipient_ids, actor_id, verb, target=None, aggregate=False):
+    """
+    Writes the same event for several recipients with one insert.
+    """
+    NotificationEvent.objects.bulk_create([
+        _event(recipient_id, actor_id, verb, target, aggregate)
+        for recipient_id in recipient_ids if recipient_id != actor_id
+    ])
+
+
+def _roll_up(groups, now):
+    """
+    Turns {(recipient_id, verb, target_content_type_id, target_object_id): actor ids,
+    most recent first} into notifications to create and to update. A group with an
+    unread notification for the same target extends it. The actor count is
+    approximate across drains: only the recent actors kept on the notification are
+    recognised as repeats.
+    """
+    existing = {}
+    candidates = Notification.objects.filter(
+        read=False,
+        recipient_id__in={key[0] for key in groups},
+        target_object_id__in={key[3] for key in groups},
+    )
+    for notification in candidates:
+        key = (notification.recipient_id, notification.verb, notification.target_content_type_id,
+               notification.target_object_id)
+        existing.setdefault(key, notification)
+
+    created, updated = [], []
+    for key, actor_ids in groups.items():
+        recipient_id, verb, content_type_id, object_id = key
+        notification = existing.get(key)
+        if notification is None:
+            created.append(Notification(
+                recipient_id=recipient_id,
+                actor_id=actor_ids[0],
+                verb=verb,
+                target_content_type_id=content_type_id,
+                target_object_id=object_id,
+                actor_count=len(actor_ids),
+                recent_actors=actor_ids[:RECENT_ACTORS],
+            ))
+            continue
+        new_actors = [actor_id for actor_id in actor_ids if actor_id not in notification.recent_actors]
+        notification.actor_id = actor_ids[0]
+        notification.actor_count += len(new_actors)
+        notification.recent_actors = (actor_ids + [
+            actor_id for actor_id in notification.recent_actors if actor_id not in actor_ids
+        ])[:RECENT_ACTORS]
+        notification.timestamp = now
+        updated.append(notification)
+    return created, updated
+
+
+def _push(created, updated):
+    """
+    Pushes new and extended notifications to their recipients' open connections.
+    Only new ones add to the unread count; extended ones were unread already.
+    """
+    actor_ids = {notification.actor_id for notification in created + updated}
+    usernames = dict(User.objects.filter(pk__in=actor_ids).values_list('id', 'username'))
+    for notification, unread_delta in [(n, 1) for n in created] + [(n, 0) for n in updated]:
+        push_to_users([notification.recipient_id], {
+            'type': 'notification.created',
+            'id': notification.pk,
+            'verb': notification.verb,
+            'actor': usernames.get(notification.actor_id),
+            'actor_count': notification.actor_count,
+            'message': Notification.describe(usernames.get(notification.actor_id), notification.actor_count, notification.verb),
+            'unread_delta': unread_delta,
+        })
+
+
+def _drain_batch(batch_size):
+    with transaction.atomic():
+        # Concurrent drains take disjoint batches instead of waiting on each other.
+        events = list(NotificationEvent.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+        if not events:
+            return 0
+
+        created, groups = [], {}
+        for event in reversed(events):
+            if not event.aggregate:
+                created.append(Notification(
+                    recipient_id=event.recipient_id,
+                    actor_id=event.actor_id,
+                    verb=event.verb,
+                    target_content_type_id=event.target_content_type_id,
+                    target_object_id=event.target_object_id,
+                    recent_actors=[event.actor_id],
+                ))
+                continue
+            key = (event.recipient_id, event.verb, event.target_content_type_id, event.target_object_id)
+            actor_ids = groups.setdefault(key, [])
+            # Newest first, so a repeat by the same actor counts once.
+            if event.actor_id not in actor_ids:
+                actor_ids.append(event.actor_id)
+
+        rolled_up, updated = _roll_up(groups, timezone.now())
+        Notification.objects.bulk_create(created + rolled_up)
+        Notification.objects.bulk_update(updated, ['actor', 'actor_count', 'recent_actors', 'timestamp'])
+        NotificationEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+
+        # Bulk writes send no post_save, so revalidate the recipients' lists here,
+        # once the new rows are visible: a read in between would otherwise cache
+        # the old rows under the new generation.
+        recipient_ids = {event.recipient_id for event in events}
+
+        def revalidate():
+            for recipient_id in recipient_ids:
+                bump_generation(notifications_generation(recipient_id))
+
+        transaction.on_commit(revalidate)
+        _push(created + rolled_up, updated)
+
+    logger.info(
+        f"Drained {len(events)} notification events: {len(created) + len(rolled_up)} notifications "
+        f"created, {len(updated)} extended."
+    )
+    return len(events)
+
+
+def drain_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Turns every event in the outbox into notifications, a batch of events per
+    transaction with one insert and one update each. Returns the number of events.
+    """
+    drained = 0
+    while True:
+        count = _drain_batch(batch_size)
+        drained += count
+        if count < batch_size:
+            return drained
+
+
+def mark_read(user_id, notification_ids=None):
+    """
+    Marks the user's unread notifications read with one UPDATE, or only those in
+    `notification_ids`. Returns the number of notifications marked.
+    """
+    notifications = Notification.objects.filter(recipient_id=user_id, read=False)
+    if notification_ids is not None:
+        notifications = notifications.filter(pk__in=notification_ids)
+    marked = notifications.update(read=True)
+    if marked:
+        # update() sends no post_save, so revalidate the user's list here.
+        bump_generation(notifications_generation(user_id))
+        push_to_users([user_id], {'type': 'notification.read', 'ids': notification_ids, 'unread_delta': -marked})
+    return marked
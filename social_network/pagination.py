@@ -0,0 +1,79 @@
+import base64
+import json
+import logging
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger('api_logger')
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(position, pk):
+    """
+    Encodes a (timestamp, id) keyset position into an opaque, URL-safe cursor.
+    """
+    raw = json.dumps([position.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor back into (timestamp, id).
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position = parse_datetime(position)
+        if position is None or not isinstance(pk, int):
+            raise ValueError
+        return position, pk
+    except (ValueError, TypeError):
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}")
+
+
+def get_page_size(request, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE, param='page_size'):
+    """
+    Reads ?page_size= (or another `param`) from the request, clamped to [1, maximum].
+    """
+    try:
+        page_size = int(request.GET.get(param, default))
+    except (TypeError, ValueError):
+        page_size = default
+    return max(1, min(page_size, maximum))
+
+
+def get_page_number(request):
+    """
+    Reads the 1-based ?page= from the request, for endpoints ordered by relevance
+    rather than by a keyset column.
+    """
+    try:
+        return max(1, int(request.GET.get('page', 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def paginate_keyset(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, field='created_at'):
+    """
+    Returns (items, next_cursor) for the page of `queryset` that follows `cursor`,
+    newest first. Ordering is (field, id) descending, so the seek predicate stays
+    index-driven no matter how deep the client pages.
+    """
+    queryset = queryset.order_by(f'-{field}', '-id')
+    if cursor:
+        position, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{field}__lt': position}) | Q(**{field: position, 'id__lt': pk}))
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return items, next_cursor
@@ -0,0 +1,73 @@
+import logging
+from collections import Counter, defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from .models import ProfileSummary
+
+logger = logging.getLogger('api_logger')
+
+SUMMARY_TIMEOUT = 60 * 60
+_FIELDS = {
+    'posts': 'post_count',
+    'friends': 'friend_count',
+    'likes': 'likes_received',
+    'pending_requests': 'pending_request_count',
+}
+
+
+def summary_key(user_id):
+    return f'profile_summary:{user_id}'
+
+
+def forget_summaries(user_ids):
+    """
+    Drops the cached summaries now and again once the surrounding transaction
+    commits, so a read racing the commit cannot re-cache the old counts.
+    """
+    keys = [summary_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        cache.delete_many(keys)
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def adjust_summaries(user_ids, **deltas):
+    """
+    Atomically shifts the counters of the given users, e.g. adjust_summaries([1, 2],
+    posts=1). A user listed several times is shifted once per listing, with one
+    UPDATE per distinct multiplicity.
+    """
+    updates = {_FIELDS[name]: delta for name, delta in deltas.items() if delta}
+    occurrences = Counter(user_ids)
+    if not updates or not occurrences:
+        return
+
+    by_times = defaultdict(list)
+    for user_id, times in occurrences.items():
+        by_times[times].append(user_id)
+    for times, ids in by_times.items():
+        ProfileSummary.objects.filter(pk__in=ids).update(**{
+            field: Greatest(F(field) + delta * times, 0) for field, delta in updates.items()
+        })
+    forget_summaries(occurrences)
+
+
+def get_profile_summary(user_id):
+    """
+    Returns the user's ProfileSummary from the cache, loading it with one keyed read
+    on a miss. A user without a summary row gets one counted from the source tables.
+    """
+    key = summary_key(user_id)
+    summary = cache.get(key)
+    if summary is not None:
+        return summary
+
+    summary = ProfileSummary.objects.filter(pk=user_id).first()
+    if summary is None:
+        ProfileSummary.objects.get_or_create(pk=user_id)
+        ProfileSummary.objects.filter(pk=user_id).recount()
+        summary = ProfileSummary.objects.get(pk=user_id)
+        logger.info(f"Built the missing profile summary of user {user_id}.")
+    cache.set(key, summary, timeout=SUMMARY_TIMEOUT)
+    return summary
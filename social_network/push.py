@@ -0,0 +1,47 @@
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from .caching import bump_generation, get_generation
+
+logger = logging.getLogger('notifications')
+
+
+def user_group(user_id):
+    return f'user_{user_id}'
+
+
+def updates_generation(user_id):
+    return f'updates:{user_id}'
+
+
+def get_version(user_id):
+    """
+    The user's update version: it changes whenever something is pushed to them, so
+    a long-polling client can tell whether it missed anything.
+    """
+    return get_generation(updates_generation(user_id))
+
+
+def push_to_users(user_ids, message):
+    """
+    Sends `message`, a channel layer event with a 'type', to every open connection
+    of each user once the surrounding transaction commits, and moves their update
+    versions on.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    for user_id in user_ids:
+        bump_generation(updates_generation(user_id))
+
+    def send():
+        channel_layer = get_channel_layer()
+        try:
+            for user_id in user_ids:
+                async_to_sync(channel_layer.group_send)(user_group(user_id), message)
+        except Exception as e:
+            # Clients catch up from their version on reconnect, so a lost push is not fatal.
+            logger.error(f"Could not push {message['type']} to {len(user_ids)} users: {e}")
+
+    transaction.on_commit(send)
@@ -0,0 +1,59 @@
+from django.db.models import Q
+from .models import FriendRequest, Profile
+
+
+class Relationship:
+    """
+    How the viewer relates to another user: friends, or a pending request either way.
+    """
+    __slots__ = ('is_friend', 'request_sent', 'request_received')
+
+    def __init__(self, is_friend=False, request_sent=False, request_received=False):
+        self.is_friend = is_friend
+        self.request_sent = request_sent
+        self.request_received = request_received
+
+    def __repr__(self):
+        return (f"Relationship(is_friend={self.is_friend}, request_sent={self.request_sent}, "
+                f"request_received={self.request_received})")
+
+
+def resolve_relationships(viewer, user_ids):
+    """
+    Returns {user_id: Relationship} for `user_ids` in two queries, however many
+    users are listed: one for the viewer's friends among them and one for pending
+    friend requests between them and the viewer.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+
+    friend_ids = set(
+        Profile.objects.filter(user_friends__user=viewer, user_id__in=user_ids).values_list('user_id', flat=True)
+    )
+    sent_ids, received_ids = set(), set()
+    pending = FriendRequest.objects.filter(
+        Q(from_user=viewer, to_user_id__in=user_ids) | Q(to_user=viewer, from_user_id__in=user_ids),
+        is_accepted=False,
+    ).values_list('from_user_id', 'to_user_id')
+    for from_user_id, to_user_id in pending:
+        if from_user_id == viewer.id:
+            sent_ids.add(to_user_id)
+        else:
+            received_ids.add(from_user_id)
+
+    return {
+        user_id: Relationship(user_id in friend_ids, user_id in sent_ids, user_id in received_ids)
+        for user_id in user_ids
+    }
+
+
+def annotate_relationships(viewer, users):
+    """
+    Sets `relationship` on each user in `users` for templates, batched as in
+    resolve_relationships.
+    """
+    relationships = resolve_relationships(viewer, [user.id for user in users])
+    for user in users:
+        user.relationship = relationships[user.id]
+    return users
@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import re
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.db.models import F
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from .models import Post
+
+logger = logging.getLogger('api_logger')
+
+SEARCH_CACHE_TIMEOUT = 30
+MAX_QUERY_LENGTH = 200
+# Deeper pages cost an OFFSET over the whole match set, so they are not served.
+MAX_SEARCH_PAGE = 50
+
+# Control characters never appear in post text, so they can mark matches safely
+# until the snippet has been HTML-escaped.
+_START_SEL, _STOP_SEL = '\x02', '\x03'
+_PREFIX_RE = re.compile(r'\W+')
+_FTS_TOKEN_RE = re.compile(r'(-?)(?:"([^"]*)"?|(\S+))')
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_query(query):
+    """
+    Lowercases and collapses whitespace, so equivalent queries share cache entries.
+    """
+    return ' '.join(query.lower().split())[:MAX_QUERY_LENGTH]
+
+
+def build_search_query(query):
+    """
+    Parses `query` with websearch_to_tsquery, treating its last word as a prefix so
+    results appear while the user is still typing it. Quoted phrases and negated
+    words are left to the websearch parser as typed.
+    """
+    head, _, last = query.rpartition(' ')
+    prefix = _PREFIX_RE.sub('', last)
+    if not prefix or '"' in query or last.startswith('-') or last == 'or':
+        return SearchQuery(query, search_type='websearch')
+
+    search_query = SearchQuery(f'{prefix}:*', search_type='raw')
+    if head:
+        search_query = SearchQuery(head, search_type='websearch') & search_query
+    return search_query
+
+
+def build_fts_query(query):
+    """
+    Translates a websearch-style query into an FTS5 expression: words and quoted
+    phrases must all match, `-word` excludes, a trailing bare word matches as a
+    prefix and `or` is ignored. Every term is quoted, so FTS5 syntax in the input is
+    never interpreted. Returns None if nothing searchable is left.
+    """
+    terms, excluded = [], []
+    prefix = False
+    for negated, phrase, word in _FTS_TOKEN_RE.findall(query):
+        text = ' '.join(_WORD_RE.findall(phrase or word))
+        if not text or (word == 'or' and not negated):
+            continue
+        (excluded if negated else terms).append(f'"{text}"')
+        prefix = bool(word) and not negated
+    if not terms:
+        return None
+    if prefix:
+        terms[-1] += '*'
+    return ' NOT '.join([' AND '.join(terms)] + excluded)
+
+
+def highlight(headline):
+    return escape(headline).replace(_START_SEL, '<mark>').replace(_STOP_SEL, '</mark>')
+
+
+class PostgresSearchBackend:
+    """
+    Ranks posts by their tsvector column, kept current by a database trigger.
+    """
+
+    def search(self, query, page, page_size):
+        search_query = build_search_query(query)
+        offset = (page - 1) * page_size
+        posts = list(
+            Post.objects.for_feed()
+            .filter(search_vector=search_query)
+            .annotate(
+                rank=SearchRank(F('search_vector'), search_query),
+                headline=SearchHeadline(
+                    'content', search_query,
+                    start_sel=_START_SEL, stop_sel=_STOP_SEL, max_words=35, min_words=15,
+                ),
+            )
+            .order_by('-rank', '-id')[offset:offset + page_size + 1]
+        )
+        for post in posts:
+            post.headline = highlight(post.headline)
+        return posts[:page_size], len(posts) > page_size
+
+
+class SQLiteSearchBackend:
+    """
+    Ranks posts with BM25 over an FTS5 table that triggers keep in sync with the
+    posts table. Titles weigh twice as much as contents, as they do on PostgreSQL.
+    """
+    table = 'social_network_post_fts'
+
+    def search(self, query, page, page_size):
+        match = build_fts_query(query)
+        if match is None:
+            return [], False
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT rowid, -bm25({self.table}, 2.0, 1.0), snippet({self.table}, 1, %s, %s, '…', 32)
+                FROM {self.table} WHERE {self.table} MATCH %s
+                ORDER BY bm25({self.table}, 2.0, 1.0), rowid DESC
+                LIMIT %s OFFSET %s
+                """,
+                [_START_SEL, _STOP_SEL, match, page_size + 1, (page - 1) * page_size],
+            )
+            rows = cursor.fetchall()
+
+        posts_by_id = Post.objects.for_feed().in_bulk([row[0] for row in rows[:page_size]])
+        posts = []
+        for post_id, rank, snippet in rows[:page_size]:
+            post = posts_by_id.get(post_id)
+            if post is not None:
+                post.rank, post.headline = rank, highlight(snippet)
+                posts.append(post)
+        return posts, len(rows) > page_size
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')")
+
+
+BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """
+    Returns the backend named by settings.POST_SEARCH_BACKEND, or the one matching
+    the default database.
+    """
+    path = getattr(settings, 'POST_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    try:
+        return BACKENDS[connection.vendor]()
+    except KeyError:
+        raise ImproperlyConfigured(f"No post search backend for the {connection.vendor} database.")
+
+
+def search_posts(query, page=1, page_size=20):
+    """
+    Returns (posts, has_next) for one page of posts matching `query`, best match
+    first. Each post carries its `rank` and an HTML-safe `headline` snippet with
+    the matched terms in <mark> tags.
+    """
+    return get_search_backend().search(query, page, page_size)
+
+
+def search_cache_key(query, page, page_size):
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return f'post_search:{digest}:{page}:{page_size}'
+
+
+def cached_search(query, page, page_size, serialize):
+    """
+    Runs search_posts and caches the serialized page briefly, keyed by the
+    normalized query, so a popular query is ranked once per timeout rather than
+    once per keystroke. There is no next page past MAX_SEARCH_PAGE.
+    """
+    query = normalize_query(query)
+    key = search_cache_key(query, page, page_size)
+    data = cache.get(key)
+    if data is None:
+        posts, has_next = search_posts(query, page, page_size)
+        data = {'results': serialize(posts), 'next_page': page + 1 if has_next and page < MAX_SEARCH_PAGE else None}
+        cache.set(key, data, timeout=SEARCH_CACHE_TIMEOUT)
+    return data
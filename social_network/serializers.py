@@ -47,14 +47,47 @@ class PostSerializer(serializers.ModelSerializer):
         return instance
 
 
+class BulkPostSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Post
+        fields = ['title', 'content']
+
+
+class PostFeedSerializer(PostSerializer):
+    author_username = serializers.CharField(source='author.username', read_only=True)
+    author_image = serializers.SerializerMethodField()
+    like_count = serializers.IntegerField(read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ['author_username', 'author_image', 'like_count', 'comment_count']
+
+    def get_author_image(self, obj):
+        profile = getattr(obj.author, 'profile', None)
+        return profile.image.url if profile and profile.image else None
+
+
+class PostSearchSerializer(PostFeedSerializer):
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.CharField(read_only=True)
+
+    class Meta(PostFeedSerializer.Meta):
+        fields = PostFeedSerializer.Meta.fields + ['rank', 'headline']
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField()
+    author_image = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = ['id', 'content', 'created_at', 'author', 'post']
+        fields = ['id', 'content', 'created_at', 'author', 'author_image', 'post']
         read_only_fields = ['author', 'post', 'created_at']
 
+    def get_author_image(self, obj):
+        profile = getattr(obj.author, 'profile', None)
+        return profile.image.url if profile and profile.image else None
+
 
 class UserRegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
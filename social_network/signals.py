@@ -1,10 +1,17 @@
 from django.dispatch import Signal, receiver
-from .tasks import create_notification
-from django.db.models.signals import post_save
+from .tasks import fanout_post, sync_timeline_friendship
+from .likes import forget_post
+from .friends import forget_friends, record_friendships
+from .fragments import bump_versions, forget_version
+from .caching import POSTS_GENERATION, bump_generation, notifications_generation
+from .profile_summary import adjust_summaries
+from .notifications import record_event, record_events
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.contrib.postgres.search import SearchVector
-from .models import Post
-from django.db import connection
+from .models import Comment, FriendRequest, Notification, Post, Profile, ProfileSummary
+from django.db import transaction
 
 friend_request_sent = Signal()
 friend_request_accepted = Signal()
@@ -13,48 +20,191 @@ comment_added = Signal()
 
 @receiver(friend_request_sent)
 def handle_friend_request_sent(sender, from_user, to_user, **kwargs):
-    create_notification.delay(
-        recipient_id=to_user.id,
-        actor_id=from_user.id,
-        verb='sent you a friend request'
-    )
+    record_event(to_user.id, from_user.id, 'sent you a friend request')
 
 
 @receiver(friend_request_accepted)
-def handle_friend_request_accepted(sender, from_user, to_user, **kwargs):
-    create_notification.delay(
-        recipient_id=from_user.id,
-        actor_id=to_user.id,
-        verb='accepted your friend request'
-    )
+def handle_friend_request_accepted(sender, from_user_ids, to_user, **kwargs):
+    record_events(from_user_ids, to_user.id, 'accepted your friend request')
 
 
 @receiver(post_liked)
 def handle_post_liked(sender, post, user, **kwargs):
-    create_notification.delay(
-        recipient_id=post.author.id,
-        actor_id=user.id,
-        verb='liked your post',
-        target_content_type=post._meta.model_name,
-        target_object_id=post.id
-    )
+    record_event(post.author_id, user.id, 'liked your post', target=post, aggregate=True)
 
 
 @receiver(comment_added)
 def handle_comment_added(sender, post, user, comment, **kwargs):
-    create_notification.delay(
-        recipient_id=post.author.id,
-        actor_id=user.id,
-        verb='commented on your post',
-        target_content_type=post._meta.model_name,
-        target_object_id=post.id
+    record_event(post.author_id, user.id, 'commented on your post', target=post, aggregate=True)
+
+
+@receiver(post_save, sender=Post)
+def fanout_new_post(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: fanout_post.delay(instance.id))
+
+
+@receiver(m2m_changed, sender=Profile.friends.through)
+def sync_friend_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove') and pk_set:
+        pairs = [(pk, instance.pk) for pk in pk_set] if reverse else [(instance.pk, pk) for pk in pk_set]
+        record_friendships(pairs)
+    elif action == 'pre_clear':
+        # Clearing reports no ids, so the affected sets are reloaded on next use.
+        if reverse:
+            profile_ids = list(sender.objects.filter(to_profile=instance).values_list('from_profile_id', flat=True))
+        else:
+            profile_ids = [instance.pk]
+        transaction.on_commit(lambda: forget_friends(profile_ids))
+
+
+@receiver(post_delete, sender=Profile)
+def forget_deleted_profile_friends(sender, instance, **kwargs):
+    profile_id = instance.pk
+    transaction.on_commit(lambda: forget_friends([profile_id]))
+
+
+@receiver(m2m_changed, sender=Profile.friends.through)
+def sync_friend_timeline(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    friend_user_ids = list(Profile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True))
+    user_id = instance.user_id
+    added = action == 'post_add'
+
+    def sync():
+        if reverse:
+            # `instance` was added to (or removed from) the other profiles' friends
+            # lists, so it is their timelines that change.
+            for friend_user_id in friend_user_ids:
+                sync_timeline_friendship.delay(friend_user_id, [user_id], added)
+        else:
+            sync_timeline_friendship.delay(user_id, friend_user_ids, added)
+
+    transaction.on_commit(sync)
+
+
+@receiver(m2m_changed, sender=Post.likes.through)
+def update_like_count(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add' and pk_set:
+        if reverse:
+            Post.adjust_counts(pk_set, likes=1)
+            bump_versions(pk_set)
+            adjust_summaries(Post.objects.filter(pk__in=pk_set).values_list('author_id', flat=True), likes=1)
+        else:
+            Post.adjust_counts([instance.pk], likes=len(pk_set))
+            bump_versions([instance.pk])
+            adjust_summaries([instance.author_id], likes=len(pk_set))
+    elif action in ('pre_remove', 'pre_clear'):
+        # Only rows that actually exist are removed, so count them before they go.
+        likes = sender.objects.filter(user=instance) if reverse else sender.objects.filter(post=instance)
+        if pk_set is not None:
+            likes = likes.filter(**{'post_id__in' if reverse else 'user_id__in': pk_set})
+        instance._unliked_post_ids = list(likes.values_list('post_id', flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        post_ids = instance.__dict__.pop('_unliked_post_ids', [])
+        if reverse:
+            Post.adjust_counts(post_ids, likes=-1)
+            adjust_summaries(Post.objects.filter(pk__in=post_ids).values_list('author_id', flat=True), likes=-1)
+        elif post_ids:
+            Post.adjust_counts([instance.pk], likes=-len(post_ids))
+            adjust_summaries([instance.author_id], likes=-len(post_ids))
+        bump_versions(set(post_ids))
+
+
+@receiver(post_save, sender=Post)
+def increment_post_count(sender, instance, created, **kwargs):
+    if created:
+        adjust_summaries([instance.author_id], posts=1)
+
+
+@receiver(post_delete, sender=Post)
+def decrement_post_count(sender, instance, **kwargs):
+    adjust_summaries([instance.author_id], posts=-1, likes=-instance.like_count)
+
+
+@receiver(m2m_changed, sender=Profile.friends.through)
+def update_friend_count(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add' and pk_set:
+        if reverse:
+            adjust_summaries(Profile.objects.filter(pk__in=pk_set).values_list('user_id', flat=True), friends=1)
+        else:
+            adjust_summaries([instance.user_id], friends=len(pk_set))
+    elif action in ('pre_remove', 'pre_clear'):
+        # As with likes, only rows that actually exist are removed.
+        rows = sender.objects.filter(to_profile=instance) if reverse else sender.objects.filter(from_profile=instance)
+        if pk_set is not None:
+            rows = rows.filter(**{'from_profile_id__in' if reverse else 'to_profile_id__in': pk_set})
+        instance._unfriended_user_ids = list(rows.values_list('from_profile__user_id', flat=True))
+    elif action in ('post_remove', 'post_clear'):
+        adjust_summaries(instance.__dict__.pop('_unfriended_user_ids', []), friends=-1)
+
+
+@receiver(pre_delete, sender=Profile)
+def decrement_friend_counts_of_deleted_profile(sender, instance, **kwargs):
+    # The friendship rows are removed by cascade, which sends no m2m_changed.
+    adjust_summaries(
+        sender.friends.through.objects.filter(to_profile=instance).values_list('from_profile__user_id', flat=True),
+        friends=-1,
     )
 
+
+@receiver(post_save, sender=FriendRequest)
+def increment_pending_request_count(sender, instance, created, **kwargs):
+    if created and not instance.is_accepted:
+        adjust_summaries([instance.to_user_id], pending_requests=1)
+
+
+@receiver(post_delete, sender=FriendRequest)
+def decrement_pending_request_count(sender, instance, **kwargs):
+    if not instance.is_accepted:
+        adjust_summaries([instance.to_user_id], pending_requests=-1)
+
+
+@receiver(post_save, sender=User)
+def create_profile_summary(sender, instance, created, **kwargs):
+    if created:
+        ProfileSummary.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count(sender, instance, created, **kwargs):
+    if created:
+        Post.adjust_counts([instance.post_id], comments=1)
+    bump_versions([instance.post_id])
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, origin=None, **kwargs):
+    # Comments removed by deleting their post need no bookkeeping.
+    if isinstance(origin, Post) or (isinstance(origin, QuerySet) and origin.model is Post):
+        return
+    Post.adjust_counts([instance.post_id], comments=-1)
+    bump_versions([instance.post_id])
+
+
+@receiver(post_delete, sender=Post)
+def forget_post_likers(sender, instance, **kwargs):
+    post_id = instance.pk
+    transaction.on_commit(lambda: forget_post(post_id))
+    transaction.on_commit(lambda: forget_version(post_id))
+
+
 @receiver(post_save, sender=Post)
-def update_search_vector(sender, instance, **kwargs):
-    if connection.vendor == 'postgresql':
-        from django.contrib.postgres.search import SearchVector
-        Post.objects.filter(id=instance.id).update(
-            search_vector=SearchVector('title', weight='A') + 
-                          SearchVector('content', weight='B')
-        )
+def bump_post_version(sender, instance, created, **kwargs):
+    if not created:
+        bump_versions([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_posts_generation(sender, **kwargs):
+    bump_generation(POSTS_GENERATION)
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def bump_notifications_generation(sender, instance, **kwargs):
+    bump_generation(notifications_generation(instance.recipient_id))
@@ -0,0 +1,137 @@
+import logging
+import time
+import numpy as np
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+from scipy import sparse
+from .models import Profile
+
+logger = logging.getLogger('feed_logger')
+
+SUGGESTION_COUNT = 20
+SUGGESTIONS_TTL = 60 * 60 * 48
+# Rows of the mutual-friend product computed at once; bounds memory when a few
+# profiles have very large friend lists.
+BLOCK_SIZE = 5000
+EDGE_CHUNK_SIZE = 100000
+
+
+def suggestions_key(profile_id):
+    return f'suggestions:profile:{profile_id}'
+
+
+def _delete_stale(conn, stored_ids):
+    """
+    Deletes the suggestions of profiles that got no candidates this time, such as
+    people who lost their last friend. Returns the number of sets deleted.
+    """
+    prefix = suggestions_key('')
+    stale = []
+    for key in conn.scan_iter(match=f'{prefix}*', count=1000):
+        profile_id = key.decode()[len(prefix):]
+        # Skips the staging keys of a run in progress.
+        if profile_id.isdigit() and int(profile_id) not in stored_ids:
+            stale.append(key)
+    for start in range(0, len(stale), 1000):
+        conn.delete(*stale[start:start + 1000])
+    return len(stale)
+
+
+def load_friend_graph():
+    """
+    Returns (profile_ids, adjacency): the sorted ids of every profile in a friendship
+    and a CSR matrix whose row i marks the friends of profile_ids[i].
+    """
+    edges = Profile.friends.through.objects.values_list('from_profile_id', 'to_profile_id')
+    pairs = np.fromiter(
+        (pk for edge in edges.iterator(chunk_size=EDGE_CHUNK_SIZE) for pk in edge),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    profile_ids, indices = np.unique(pairs, return_inverse=True)
+    indices = indices.reshape(-1, 2)
+    adjacency = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.int32), (indices[:, 0], indices[:, 1])),
+        shape=(len(profile_ids), len(profile_ids)),
+    )
+    # Duplicate edges would be summed; a friendship counts once.
+    adjacency.data[:] = 1
+    return profile_ids, adjacency
+
+
+def top_mutual_friends(adjacency, top_k=SUGGESTION_COUNT, block_size=BLOCK_SIZE):
+    """
+    Yields (row, candidate_rows, mutual_counts) with up to `top_k` candidates per row,
+    ranked by mutual friends. Counts come from A @ A.T, one block of rows at a time,
+    with the row itself and its existing friends removed.
+    """
+    size = adjacency.shape[0]
+    transposed = adjacency.T.tocsr()
+    for start in range(0, size, block_size):
+        block = adjacency[start:start + block_size]
+        rows = block.shape[0]
+        itself = sparse.csr_matrix(
+            (np.ones(rows, dtype=np.int32), (np.arange(rows), np.arange(start, start + rows))),
+            shape=block.shape,
+        )
+        mutual = block @ transposed
+        mutual = (mutual - mutual.multiply((block + itself) > 0)).tocsr()
+        mutual.eliminate_zeros()
+
+        for offset in range(mutual.shape[0]):
+            row_start, row_end = mutual.indptr[offset], mutual.indptr[offset + 1]
+            if row_start == row_end:
+                continue
+            candidates = mutual.indices[row_start:row_end]
+            counts = mutual.data[row_start:row_end]
+            if len(counts) > top_k:
+                best = np.argpartition(-counts, top_k)[:top_k]
+                candidates, counts = candidates[best], counts[best]
+            yield start + offset, candidates, counts
+
+
+def compute_suggestions(top_k=SUGGESTION_COUNT):
+    """
+    Recomputes "people you may know" for every profile from the whole friend graph
+    and stores each profile's candidates in Redis as a sorted set scored by mutual
+    friends. Sets are written under a temporary key and renamed into place, so
+    readers never see a half-written list. Returns the number of profiles stored.
+    """
+    started = time.monotonic()
+    profile_ids, adjacency = load_friend_graph()
+    conn = get_redis_connection('default')
+
+    stored_ids = set()
+    pipe = conn.pipeline(transaction=False)
+    for row, candidates, counts in top_mutual_friends(adjacency, top_k):
+        profile_id = int(profile_ids[row])
+        key = suggestions_key(profile_id)
+        staging = f'{key}:staging'
+        pipe.delete(staging)
+        pipe.zadd(staging, {int(profile_ids[c]): int(n) for c, n in zip(candidates, counts)})
+        pipe.expire(staging, SUGGESTIONS_TTL)
+        pipe.rename(staging, key)
+        stored_ids.add(profile_id)
+        if len(stored_ids) % 1000 == 0:
+            pipe.execute()
+    pipe.execute()
+    deleted = _delete_stale(conn, stored_ids)
+
+    logger.info(
+        f"Computed friend suggestions for {len(stored_ids)} of {len(profile_ids)} profiles "
+        f"({adjacency.nnz} edges, {deleted} stale lists deleted) in {time.monotonic() - started:.1f}s."
+    )
+    return len(stored_ids)
+
+
+def get_suggestions(profile_id, limit=SUGGESTION_COUNT):
+    """
+    Returns [(profile_id, mutual_friends)] for a profile, best first, as of the last
+    computation. Returns no suggestions if Redis is unavailable.
+    """
+    try:
+        conn = get_redis_connection('default')
+        entries = conn.zrevrange(suggestions_key(profile_id), 0, limit - 1, withscores=True)
+    except RedisError as e:
+        logger.error(f"Friend suggestions unavailable for profile {profile_id}: {e}")
+        return []
+    return [(int(member), int(score)) for member, score in entries]
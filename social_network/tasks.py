@@ -1,25 +1,120 @@
 import logging
 from celery import shared_task
-from .models import Notification
+from . import feed, likes, notifications, profile_summary, suggestions
+from .models import Post, ProfileSummary
 
 logger = logging.getLogger('notifications')
 
 
 @shared_task
-def create_notification(recipient_id, actor_id, verb, target_content_type=None, target_object_id=None):
+def drain_notification_outbox():
     """
-    Asynchronously creates a notification.
+    Turns the events written to the notification outbox into notifications, in batches.
     """
-    notification = Notification.objects.create(
-        recipient_id=recipient_id,
-        actor_id=actor_id,
-        verb=verb,
-        target_content_type_id=target_content_type,
-        target_object_id=target_object_id
-    )
-    logger.info(f"Notification {notification.id} created for user {recipient_id} by actor {actor_id}: '{verb}'.")
+    return notifications.drain_outbox()
 
-    return f"Notification created for user {recipient_id}"
+
+@shared_task
+def fanout_post(post_id):
+    """
+    Pushes a newly created post into the materialized timelines of its author's friends.
+    """
+    try:
+        post = Post.objects.only('id', 'author_id', 'created_at').get(pk=post_id)
+    except Post.DoesNotExist:
+        logger.warning(f"Post {post_id} no longer exists, skipping fan-out.")
+        return 0
+    return feed.fanout_post(post)
+
+
+@shared_task
+def fanout_posts(post_ids):
+    """
+    Pushes a batch of bulk-created posts into their authors' friends' timelines.
+    """
+    posts = Post.objects.filter(pk__in=post_ids).only('id', 'author_id', 'created_at')
+    return feed.fanout_posts(posts)
+
+
+@shared_task
+def sync_timeline_friendship(user_id, friend_user_ids, added):
+    """
+    Adds or removes friends' posts in a user's timeline after the friends list changed.
+    """
+    for friend_user_id in friend_user_ids:
+        if added:
+            feed.add_author_to_timeline(user_id, friend_user_id)
+        else:
+            feed.remove_author_from_timeline(user_id, friend_user_id)
+
+
+@shared_task
+def reconcile_post_counters(chunk_size=1000):
+    """
+    Walks posts in id order and repairs like/comment counters that drifted from the
+    source tables. Each chunk is compared and corrected in its own short statements.
+    """
+    last_id = 0
+    repaired = 0
+    while True:
+        chunk = list(
+            Post.objects.filter(pk__gt=last_id).order_by('pk').with_actual_counts()
+            .values_list('pk', 'like_count', 'comment_count', 'actual_like_count', 'actual_comment_count')[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        stale_ids = [pk for pk, likes, comments, actual_likes, actual_comments in chunk
+                     if likes != actual_likes or comments != actual_comments]
+        if stale_ids:
+            Post.objects.filter(pk__in=stale_ids).recount()
+            repaired += len(stale_ids)
+
+    logger.info(f"Reconciled post counters, repaired {repaired} posts.")
+    return repaired
+
+
+@shared_task
+def reconcile_profile_summaries(chunk_size=1000):
+    """
+    Walks profile summaries in user id order and repairs counters that drifted from
+    the source tables, e.g. after cascaded deletes that send no signals.
+    """
+    fields = ['post_count', 'friend_count', 'likes_received', 'pending_request_count']
+    last_id = 0
+    repaired = 0
+    while True:
+        chunk = list(
+            ProfileSummary.objects.filter(pk__gt=last_id).order_by('pk').with_actual_counts()
+            .values('pk', *fields, *[f'actual_{field}' for field in fields])[:chunk_size]
+        )
+        if not chunk:
+            break
+        last_id = chunk[-1]['pk']
+        stale_ids = [row['pk'] for row in chunk if any(row[field] != row[f'actual_{field}'] for field in fields)]
+        if stale_ids:
+            ProfileSummary.objects.filter(pk__in=stale_ids).recount()
+            profile_summary.forget_summaries(stale_ids)
+            repaired += len(stale_ids)
+
+    logger.info(f"Reconciled profile summaries, repaired {repaired} users.")
+    return repaired
+
+
+@shared_task
+def flush_pending_likes():
+    """
+    Persists like toggles buffered in Redis to the database.
+    """
+    return likes.flush_pending_likes()
+
+
+@shared_task
+def compute_friend_suggestions():
+    """
+    Recomputes "people you may know" for every profile from the friend graph.
+    """
+    return suggestions.compute_suggestions()
 
 
 @shared_task
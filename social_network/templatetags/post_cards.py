@@ -0,0 +1,21 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+
+@register.simple_tag
+def slot(name):
+    """
+    Marks a viewer-specific spot in a cached post card, filled in by
+    social_network.fragments on every request.
+    """
+    return mark_safe(f'<!--slot:{name}-->')
+
+
+@register.simple_tag
+def since(value):
+    """
+    Relative timestamp that stays current inside a cached fragment.
+    """
+    return mark_safe(f'<!--slot:since:{value.isoformat()}-->')
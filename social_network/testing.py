@@ -0,0 +1,34 @@
+from django.test import TestCase as DjangoTestCase, TransactionTestCase as DjangoTransactionTestCase, override_settings
+from fakeredis import FakeConnection
+from rest_framework.test import APITestCase as DRFAPITestCase
+
+# Tests talk to an in-process fake Redis server, so running the suite needs no Redis
+# and never flushes a developer's cache. The fake server runs the Lua scripts too.
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': 'redis://fake-redis:6379/1',
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CONNECTION_POOL_KWARGS': {'connection_class': FakeConnection},
+        },
+    },
+}
+IN_MEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+isolated_services = override_settings(CACHES=TEST_CACHES, CHANNEL_LAYERS=IN_MEMORY_CHANNEL_LAYERS)
+
+
+@isolated_services
+class TestCase(DjangoTestCase):
+    pass
+
+
+@isolated_services
+class TransactionTestCase(DjangoTransactionTestCase):
+    pass
+
+
+@isolated_services
+class APITestCase(DRFAPITestCase):
+    pass
@@ -1,11 +1,29 @@
+from io import StringIO
+from unittest import mock, skipUnless
 from bs4 import BeautifulSoup
-from django.test import TestCase, Client
+from django.contrib.postgres.search import SearchQuery
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.test import Client
 from django.contrib.auth.models import User
 from django.urls import reverse
-from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Post, Comment, Profile, FriendRequest
-from .serializers import PostSerializer
+from .models import Post, Comment, Profile, ProfileSummary, FriendRequest, Notification, NotificationEvent
+from .serializers import PostSerializer, PostFeedSerializer
+from . import feed, friend_requests, friends, notifications, suggestions, user_search
+from .tasks import reconcile_post_counters, reconcile_profile_summaries, sync_timeline_friendship
+from .likes import flush_pending_likes
+from redis.exceptions import RedisError
+from .management.commands.reindex_posts import CHECKPOINT_KEY
+from .search import MAX_SEARCH_PAGE, SQLiteSearchBackend, search_posts, build_fts_query, highlight, normalize_query
+from .user_search import find_users
+from .relationships import resolve_relationships
+from .profile_summary import get_profile_summary
+from .fragments import VERSION_TIMEOUT, version_key
+from .testing import APITestCase, TestCase
+from .caching import POSTS_GENERATION, get_generation
 
 
 class LoginPageTest(TestCase):
@@ -54,13 +72,46 @@ class PostListTests(APITestCase):
         self.url = '/social_network/posts/'
 
     def test_get_posts(self):
-        """Test GET request to fetch all posts."""
+        """Test GET request to fetch the first page of posts, newest first."""
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        posts = Post.objects.all()
-        serializer = PostSerializer(posts, many=True)
-        self.assertEqual(response.data, serializer.data)
+        posts = Post.objects.for_feed().order_by('-created_at', '-id')
+        serializer = PostFeedSerializer(posts, many=True)
+        self.assertEqual(response.data['results'], serializer.data)
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_get_posts_cursor_pagination(self):
+        """Test that following next_cursor walks every post exactly once."""
+        self.post1.likes.add(self.user)
+        Comment.objects.create(content="Nice one", author=self.user, post=self.post1)
+
+        first = self.client.get(self.url, {'page_size': 1})
+        self.assertEqual([p['id'] for p in first.data['results']], [self.post2.id])
+        self.assertIsNotNone(first.data['next_cursor'])
+
+        second = self.client.get(self.url, {'page_size': 1, 'cursor': first.data['next_cursor']})
+        self.assertEqual([p['id'] for p in second.data['results']], [self.post1.id])
+        self.assertEqual(second.data['results'][0]['like_count'], 1)
+        self.assertEqual(second.data['results'][0]['comment_count'], 1)
+        self.assertIsNone(second.data['next_cursor'])
+
+    def test_get_posts_cache_invalidated_on_write(self):
+        """Test that cached pages are dropped when a post changes."""
+        self.client.get(self.url)
+        with mock.patch('social_network.views.fbv.paginate_keyset') as paginate:
+            self.client.get(self.url)
+        paginate.assert_not_called()
+
+        self.post1.title = "Edited title"
+        self.post1.save()
+        response = self.client.get(self.url)
+        self.assertIn("Edited title", [p['title'] for p in response.data['results']])
+
+    def test_get_posts_invalid_cursor(self):
+        """Test that a malformed cursor is rejected."""
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_create_post_success(self):
         """Test POST request to create a new post with valid data."""
@@ -105,9 +156,27 @@ class CommentListTests(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(response.data), 2)
-        self.assertEqual(response.data[0]['content'], "Test Comment 1")
-        self.assertEqual(response.data[1]['content'], "Test Comment 2")
+        results = response.data['results']
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['content'], "Test Comment 2")
+        self.assertEqual(results[1]['content'], "Test Comment 1")
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_get_comments_pagination(self):
+        """Test GET request pages through comments newest first."""
+        for i in range(3):
+            Comment.objects.create(content=f"Comment {i}", author=self.user, post=self.post)
+
+        response = self.client.get(self.url, {'page_size': 2})
+        self.assertEqual([c['content'] for c in response.data['results']], ["Comment 2", "Comment 1"])
+
+        response = self.client.get(self.url, {'page_size': 2, 'cursor': response.data['next_cursor']})
+        self.assertEqual([c['content'] for c in response.data['results']], ["Comment 0"])
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_get_comments_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_get_comments_post_not_found(self):
         """Test GET request when the post does not exist."""
@@ -147,6 +216,7 @@ class CommentListTests(APITestCase):
 
 class LikePostTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username="testuser", password="password123")
         self.client.login(username="testuser", password="password123")
 
@@ -165,7 +235,10 @@ class LikePostTests(TestCase):
         self.assertTrue(data['liked'])
         self.assertEqual(data['total_likes'], 1)
 
+        flush_pending_likes()
         self.assertIn(self.user, self.post.likes.all())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
 
     def test_unlike_post(self):
         """Test unliking a post."""
@@ -179,8 +252,46 @@ class LikePostTests(TestCase):
         self.assertFalse(data['liked'])
         self.assertEqual(data['total_likes'], 0)
 
+        flush_pending_likes()
         self.assertNotIn(self.user, self.post.likes.all())
 
+    def test_like_state_loaded_from_database(self):
+        """Test that existing likes are honoured when the liker set is cold."""
+        other = User.objects.create_user(username="otheruser", password="password123")
+        self.post.likes.add(self.user, other)
+
+        response = self.client.post(self.url)
+        self.assertEqual(response.json(), {'liked': False, 'total_likes': 1})
+
+        flush_pending_likes()
+        self.assertEqual(list(self.post.likes.all()), [other])
+
+    def test_cached_post_list_shows_live_like_counts(self):
+        self.client.get(reverse('post_list'))
+        self.client.post(self.url)
+        generation = get_generation(POSTS_GENERATION)
+
+        for flush in (False, True):
+            if flush:
+                flush_pending_likes()
+            response = self.client.get(reverse('post_list'))
+            self.assertEqual(response.json()['results'][0]['like_count'], 1)
+        self.assertEqual(get_generation(POSTS_GENERATION), generation)
+
+    def test_large_liker_set_is_loaded_in_chunks(self):
+        fans = [User.objects.create_user(username=f"fan{i}", password="password123") for i in range(5)]
+        self.post.likes.add(*fans)
+
+        with mock.patch('social_network.likes.WARM_CHUNK_SIZE', 2):
+            response = self.client.post(self.url)
+        self.assertEqual(response.json(), {'liked': True, 'total_likes': 6})
+
+    def test_like_falls_back_to_database_without_redis(self):
+        with mock.patch('social_network.views.fbv.toggle_like', side_effect=RedisError):
+            response = self.client.post(self.url)
+        self.assertEqual(response.json(), {'liked': True, 'total_likes': 1})
+        self.assertIn(self.user, self.post.likes.all())
+
     def test_like_post_not_found(self):
         """Test liking a post that doesn't exist."""
         invalid_url = reverse('like_post', args=[9999])
@@ -365,6 +476,7 @@ class AcceptFriendRequestViewTestCase(TestCase):
 
 class FriendManagementViewTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.user1 = User.objects.create_user(username='user1', password='password1')
         self.user2 = User.objects.create_user(username='user2', password='password2')
         self.user3 = User.objects.create_user(username='user3', password='password3')
@@ -496,3 +608,831 @@ class PostManagementViewTestCase(TestCase):
         self.assertRedirects(response, reverse('home'))
 
         self.assertTrue(Post.objects.filter(id=self.post2.id).exists())
+
+
+class HomeFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user1 = User.objects.create_user(username='user1', password='password1')
+        self.user2 = User.objects.create_user(username='user2', password='password2')
+        self.user3 = User.objects.create_user(username='user3', password='password3')
+        self.user1.profile.friends.add(self.user2.profile)
+        self.user2.profile.friends.add(self.user1.profile)
+
+        self.own_post = Post.objects.create(title='Own post', content='Mine', author=self.user1)
+        self.friend_post = Post.objects.create(title='Friend post', content='Theirs', author=self.user2)
+        self.stranger_post = Post.objects.create(title='Stranger post', content='Unrelated', author=self.user3)
+
+        self.client = Client()
+        self.client.login(username='user1', password='password1')
+
+    def test_home_shows_own_and_friends_posts(self):
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']), [self.friend_post, self.own_post])
+
+    def test_fanout_pushes_post_into_friend_timeline(self):
+        feed.get_home_feed(self.user1)
+        new_post = Post.objects.create(title='Fresh post', content='New', author=self.user2)
+        self.assertEqual(feed.fanout_post(new_post), 2)
+
+        posts, _ = feed.get_home_feed(self.user1)
+        self.assertEqual(posts[0], new_post)
+
+    def test_removing_an_author_reads_only_their_newest_posts(self):
+        feed.get_home_feed(self.user1)
+        with CaptureQueriesContext(connection) as queries:
+            feed.remove_author_from_timeline(self.user1.id, self.user2.id)
+        self.assertIn(f'LIMIT {feed.TIMELINE_LENGTH}', queries.captured_queries[0]['sql'])
+
+        posts, _ = feed.get_home_feed(self.user1)
+        self.assertEqual(posts, [self.own_post])
+
+    def test_large_account_is_read_on_demand(self):
+        feed.get_home_feed(self.user1)
+        new_post = Post.objects.create(title='Fresh post', content='New', author=self.user2)
+        with mock.patch.object(feed, 'FANOUT_LIMIT', 0):
+            self.assertEqual(feed.fanout_post(new_post), 1)
+
+        posts, _ = feed.get_home_feed(self.user1)
+        self.assertEqual(posts, [new_post, self.friend_post, self.own_post])
+
+    def test_home_query_count_is_independent_of_page_size(self):
+        for i in range(3):
+            post = Post.objects.create(title=f'Extra post {i}', content='More', author=self.user2)
+            Comment.objects.create(content='Looks great', author=self.user2, post=post)
+            post.likes.add(self.user1)
+        self.client.get(reverse('home'))
+
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get(reverse('home'), {'page_size': 1})
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get(reverse('home'), {'page_size': 5})
+
+        self.assertEqual(len(response.context['posts']), 5)
+        self.assertEqual(len(small_page), len(large_page))
+
+    def test_feed_context_marks_liked_posts(self):
+        self.friend_post.likes.add(self.user1)
+        Comment.objects.create(content='Nice shot', author=self.user2, post=self.friend_post)
+
+        posts = feed.build_feed_context(Post.objects.for_feed().order_by('-id'), self.user1)
+        liked = {post.id: post.liked_by_viewer for post in posts}
+        self.assertTrue(liked[self.friend_post.id])
+        self.assertFalse(liked[self.own_post.id])
+        self.assertEqual([c.content for c in posts[1].comment_list], ['Nice shot'])
+
+    def test_feed_context_previews_latest_comments(self):
+        for i in range(5):
+            Comment.objects.create(content=f'Comment {i}', author=self.user2, post=self.friend_post)
+
+        posts = feed.build_feed_context(Post.objects.for_feed().order_by('-id'), self.user1)
+        self.assertEqual([c.content for c in posts[1].comment_list], ['Comment 2', 'Comment 3', 'Comment 4'])
+        self.assertIsNotNone(posts[1].comment_cursor)
+        self.assertEqual(posts[2].comment_list, [])
+        self.assertIsNone(posts[2].comment_cursor)
+
+    def test_profile_view_lists_author_posts(self):
+        response = self.client.get(reverse('profile_view', args=['user2']))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['posts']), [self.friend_post])
+
+    def test_post_cards_are_cached_per_version(self):
+        self.client.get(reverse('home'))
+        with mock.patch('social_network.fragments.render_to_string') as render_card:
+            response = self.client.get(reverse('home'))
+        render_card.assert_not_called()
+        self.assertContains(response, 'Friend post')
+
+        Comment.objects.create(content='Fresh comment', author=self.user2, post=self.friend_post)
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'Fresh comment')
+
+    def test_owner_controls_only_for_author(self):
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, f'deleteModal-{self.own_post.id}')
+        self.assertNotContains(response, f'deleteModal-{self.friend_post.id}')
+        self.assertNotContains(response, '<!--slot:')
+
+    def test_home_feed_pagination(self):
+        posts, next_cursor = feed.get_home_feed(self.user1, page_size=1)
+        self.assertEqual(posts, [self.friend_post])
+
+        posts, next_cursor = feed.get_home_feed(self.user1, cursor=next_cursor, page_size=1)
+        self.assertEqual(posts, [self.own_post])
+        self.assertIsNone(next_cursor)
+
+    def read_all_pages(self, page_size=2):
+        seen, cursor = [], None
+        while True:
+            posts, cursor = feed.get_home_feed(self.user1, cursor=cursor, page_size=page_size)
+            seen += posts
+            if cursor is None:
+                return seen
+
+    def test_pagination_keeps_posts_with_the_same_timestamp(self):
+        tied = [Post.objects.create(title=f'Tied {i}', content='Same time', author=self.user2) for i in range(3)]
+        Post.objects.update(created_at=self.own_post.created_at)
+        expected = sorted(tied + [self.friend_post, self.own_post], key=lambda post: post.id, reverse=True)
+
+        self.assertEqual(self.read_all_pages(), expected)
+        with mock.patch.object(feed, '_read_timeline', side_effect=RedisError):
+            self.assertEqual(self.read_all_pages(), expected)
+
+
+class PostCounterTests(TestCase):
+    def setUp(self):
+        self.user1 = User.objects.create_user(username='user1', password='password1')
+        self.user2 = User.objects.create_user(username='user2', password='password2')
+        self.post = Post.objects.create(title='Counted post', content='Content', author=self.user1)
+
+    def test_like_and_unlike_update_like_count(self):
+        self.post.likes.add(self.user1, self.user2)
+        self.user2.liked_posts.remove(self.post)
+        self.post.likes.remove(self.user2)
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_comment_and_delete_update_comment_count(self):
+        comment = Comment.objects.create(content='First!', author=self.user2, post=self.post)
+        Comment.objects.create(content='Second!', author=self.user2, post=self.post)
+        comment.delete()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_reconcile_repairs_drift(self):
+        self.post.likes.add(self.user2)
+        Comment.objects.create(content='First!', author=self.user2, post=self.post)
+        Post.objects.filter(pk=self.post.pk).update(like_count=7, comment_count=0)
+
+        self.assertEqual(reconcile_post_counters(chunk_size=1), 1)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (1, 1))
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.other = User.objects.create_user(username="otheruser", password="password123")
+        self.client.login(username="testuser", password="password123")
+        self.post = Post.objects.create(title="Test Post", content="Test Content", author=self.user)
+
+    def test_post_detail_not_modified(self):
+        url = reverse('post_detail', args=[self.post.id])
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.post.title = "Edited title"
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_missing_post_creates_no_version(self):
+        response = self.client.get(reverse('post_detail', args=[9999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertIsNone(cache.get(version_key(9999)))
+
+    def test_post_versions_expire(self):
+        self.client.get(reverse('post_detail', args=[self.post.id]))
+        self.assertGreater(cache.ttl(version_key(self.post.id)), 0)
+        self.assertLessEqual(cache.ttl(version_key(self.post.id)), VERSION_TIMEOUT)
+
+    def test_comment_list_revalidates_after_new_comment(self):
+        url = reverse('comment_list', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Comment.objects.create(content="New comment", author=self.other, post=self.post)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_notifications_not_modified_until_new_notification(self):
+        url = reverse('get_notifications')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Notification.objects.create(recipient=self.user, actor=self.other, verb='sent you a friend request')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['notifications']), 1)
+
+
+class BulkCreatePostsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="password123")
+        self.client.login(username="testuser", password="password123")
+        self.url = reverse('bulk_create_posts')
+
+    def test_bulk_create_posts(self):
+        data = [{"title": f"Post {i}", "content": f"Content {i}"} for i in range(3)]
+        with mock.patch('social_network.bulk.fanout_posts') as fanout:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 3)
+        fanout.delay.assert_called_once_with([post['id'] for post in response.data])
+
+    def test_bulk_create_rejects_invalid_batch(self):
+        response = self.client.post(self.url, [{"title": "No content"}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {"title": "Not a list", "content": "x"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Post.objects.exists())
+
+
+class SearchPostsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_empty_query_returns_no_results(self):
+        response = self.client.get(reverse('search_posts'), {'q': '   '})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'results': [], 'next_page': None})
+
+    def test_pages_past_the_limit_are_rejected(self):
+        with mock.patch('social_network.views.fbv.cached_search') as search:
+            response = self.client.get(reverse('search_posts'), {'q': 'sun', 'page': MAX_SEARCH_PAGE + 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        search.assert_not_called()
+
+    def test_queries_are_normalized_for_caching(self):
+        self.assertEqual(normalize_query('  Sunset   OVER\tthe sea '), 'sunset over the sea')
+
+    def test_headline_escapes_post_content(self):
+        self.assertEqual(highlight('<b>\x02sun\x03</b>'), '&lt;b&gt;<mark>sun</mark>&lt;/b&gt;')
+
+    def test_fts_query_quotes_terms(self):
+        self.assertEqual(build_fts_query('golden sun'), '"golden" AND "sun"*')
+        self.assertEqual(build_fts_query('"golden sunset" -rain'), '"golden sunset" NOT "rain"')
+        self.assertEqual(build_fts_query('NEAR(sea'), '"NEAR sea"*')
+        self.assertIsNone(build_fts_query('-rain'))
+
+    @skipUnless(connection.vendor == 'sqlite', "FTS5 backend runs on SQLite")
+    def test_sqlite_search_ranks_and_highlights(self):
+        user = User.objects.create_user(username="writer", password="password123")
+        Post.objects.create(title="Sunset", content="Golden <b>sunsets</b> over the sea", author=user)
+        Post.objects.create(title="Beach day", content="A sunny afternoon", author=user)
+        Post.objects.create(title="Cats", content="Nothing to see here", author=user)
+
+        response = self.client.get(reverse('search_posts'), {'q': 'sun', 'page_size': 1})
+        self.assertEqual(response.data['results'][0]['title'], "Sunset")
+        self.assertIn('<mark>sunsets</mark>', response.data['results'][0]['headline'])
+        self.assertNotIn('<b>', response.data['results'][0]['headline'])
+        self.assertEqual(response.data['next_page'], 2)
+
+        response = self.client.get(reverse('search_posts'), {'q': 'sun', 'page': 2, 'page_size': 1})
+        self.assertEqual([post['title'] for post in response.data['results']], ["Beach day"])
+        self.assertIsNone(response.data['next_page'])
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="writer", password="password123")
+
+    def reindex(self, *args):
+        out = StringIO()
+        call_command('reindex_posts', *args, stdout=out)
+        return out.getvalue()
+
+    @skipUnless(connection.vendor == 'sqlite', "FTS5 backend runs on SQLite")
+    def test_reindex_rebuilds_the_sqlite_index(self):
+        post = Post.objects.create(title="Sunset", content="Golden light", author=self.user)
+        table = SQLiteSearchBackend.table
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table}({table}) VALUES ('delete-all')")
+        self.assertEqual(search_posts('sunset')[0], [])
+
+        self.assertIn("Rebuilt the SQLite full-text index.", self.reindex())
+        self.assertEqual([p.id for p in search_posts('sunset')[0]], [post.id])
+
+    @skipUnless(connection.vendor == 'postgresql', "Search vectors are stored on PostgreSQL")
+    def test_trigger_keeps_the_search_vector_current(self):
+        post = Post.objects.create(title="Sunset", content="Golden light", author=self.user)
+        self.assertTrue(Post.objects.filter(pk=post.pk, search_vector=SearchQuery('sunset')).exists())
+
+        post.title = "Harbour"
+        post.save()
+        self.assertTrue(Post.objects.filter(pk=post.pk, search_vector=SearchQuery('harbour')).exists())
+        self.assertFalse(Post.objects.filter(pk=post.pk, search_vector=SearchQuery('sunset')).exists())
+
+    @skipUnless(connection.vendor == 'postgresql', "Search vectors are stored on PostgreSQL")
+    def test_reindex_resumes_from_the_checkpoint(self):
+        posts = [
+            Post.objects.create(title=f"Sunset {i}", content="Golden light", author=self.user)
+            for i in range(3)
+        ]
+        # Only title and content changes fire the trigger, so this leaves the vectors empty.
+        Post.objects.update(search_vector=None)
+        cache.set(CHECKPOINT_KEY, posts[0].id, timeout=None)
+
+        output = self.reindex('--missing-only', '--chunk-size', '1')
+        self.assertIn(f"Resuming after post {posts[0].id}.", output)
+        self.assertEqual(
+            set(Post.objects.filter(search_vector__isnull=True).values_list('pk', flat=True)), {posts[0].id},
+        )
+        self.assertIsNone(cache.get(CHECKPOINT_KEY))
+
+        self.reindex('--restart')
+        self.assertFalse(Post.objects.filter(search_vector__isnull=True).exists())
+        self.assertEqual(len(search_posts('sunset')[0]), 3)
+
+
+class UserSearchTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="viewer", password="password123")
+        for username in ["alice", "alicia", "Albert", "bob"]:
+            User.objects.create_user(username=username, password="password123")
+        self.client.login(username="viewer", password="password123")
+
+    def test_autocomplete_is_ranked_and_bounded(self):
+        response = self.client.get(reverse('user_autocomplete'), {'q': 'ali', 'limit': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([user['username'] for user in response.data['results']], ["alice"])
+
+    def test_autocomplete_excludes_viewer_and_empty_query(self):
+        response = self.client.get(reverse('user_autocomplete'), {'q': 'vie'})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(reverse('user_autocomplete'), {'q': ' '})
+        self.assertEqual(response.data['results'], [])
+
+    @skipUnless(connection.vendor != 'postgresql', "Prefix search is the non-PostgreSQL fallback")
+    def test_prefix_search_sees_new_and_renamed_users(self):
+        with self.assertNumQueries(2):
+            self.assertEqual([user.username for user in find_users('al')], ["Albert", "alice", "alicia"])
+
+        User.objects.create_user(username="alan", password="password123")
+        bob = User.objects.get(username="bob")
+        bob.username = "alfred"
+        bob.save()
+        self.assertEqual([user.username for user in find_users('al', limit=3)], ["alan", "Albert", "alfred"])
+
+
+    def test_prefix_range_handles_the_last_code_points(self):
+        self.assertEqual(user_search._prefix_range('al'), ('al', 'am'))
+        self.assertEqual(user_search._prefix_range('a\U0010ffff'), ('a\U0010ffff', 'b'))
+        self.assertEqual(user_search._prefix_range('\U0010ffff'), ('\U0010ffff', None))
+        self.assertEqual(user_search._prefix_range('a\ud7ff'), ('a\ud7ff', 'a\ue000'))
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite's LOWER() only folds ASCII")
+    def test_prefix_search_folds_case_like_sqlite(self):
+        User.objects.create_user(username="Émile", password="password123")
+        self.assertEqual([user.username for user in find_users('Ém')], ["Émile"])
+        self.assertEqual([user.username for user in find_users('AL', limit=1)], ["Albert"])
+
+
+class RelationshipResolverTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.viewer = User.objects.create_user(username='viewer', password='password123')
+        self.friend = User.objects.create_user(username='friend', password='password123')
+        self.invited = User.objects.create_user(username='invited', password='password123')
+        self.inviter = User.objects.create_user(username='inviter', password='password123')
+        self.stranger = User.objects.create_user(username='stranger', password='password123')
+        self.viewer.profile.friends.add(self.friend.profile)
+        FriendRequest.objects.create(from_user=self.viewer, to_user=self.invited)
+        FriendRequest.objects.create(from_user=self.inviter, to_user=self.viewer)
+
+    def test_resolves_each_relationship(self):
+        users = [self.friend, self.invited, self.inviter, self.stranger]
+        with self.assertNumQueries(2):
+            relationships = resolve_relationships(self.viewer, [user.id for user in users])
+
+        self.assertTrue(relationships[self.friend.id].is_friend)
+        self.assertTrue(relationships[self.invited.id].request_sent)
+        self.assertTrue(relationships[self.inviter.id].request_received)
+        stranger = relationships[self.stranger.id]
+        self.assertFalse(stranger.is_friend or stranger.request_sent or stranger.request_received)
+
+    def test_search_users_query_count_is_independent_of_results(self):
+        self.client.login(username='viewer', password='password123')
+        self.client.get(reverse('search_users'), {'q': 'zzz'})
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse('search_users'), {'q': 'stranger'})
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse('search_users'), {'q': 'in'})
+
+        self.assertEqual(len(response.context['user_statuses']), 2)
+        self.assertEqual(len(few), len(many))
+
+
+class FriendCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('social_network.signals.sync_timeline_friendship')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.profile1 = User.objects.create_user(username='user1', password='password1').profile
+        self.profile2 = User.objects.create_user(username='user2', password='password2').profile
+
+    def test_is_friend_follows_friendship_changes(self):
+        self.assertFalse(self.profile1.is_friend(self.profile2))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile1.friends.add(self.profile2)
+        self.assertTrue(self.profile1.is_friend(self.profile2))
+        self.assertFalse(self.profile2.is_friend(self.profile1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile2.user_friends.remove(self.profile1)
+        self.assertFalse(self.profile1.is_friend(self.profile2))
+
+    def test_is_friend_falls_back_to_database(self):
+        self.profile1.friends.add(self.profile2)
+        with mock.patch('social_network.friends.get_redis_connection', side_effect=RedisError):
+            self.assertTrue(self.profile1.is_friend(self.profile2))
+            self.assertFalse(self.profile2.is_friend(self.profile1))
+
+    def test_large_friend_set_is_loaded_in_chunks(self):
+        others = [User.objects.create_user(username=f'friend{i}', password='password123').profile for i in range(5)]
+        self.profile1.friends.add(*others)
+        with mock.patch('social_network.friends.WARM_CHUNK_SIZE', 2):
+            self.assertTrue(self.profile1.is_friend(others[-1]))
+        with self.assertNumQueries(0):
+            self.assertEqual(friends.get_friend_ids_many([self.profile1.id])[self.profile1.id], {p.id for p in others})
+
+    def test_change_drops_a_set_warmed_before_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile1.friends.add(self.profile2)
+            # A warm-up that read the database before the friendship committed.
+            with mock.patch('social_network.friends._load_friend_ids', return_value=[]):
+                friends.warm_friends(self.profile1.id)
+        self.assertTrue(self.profile1.is_friend(self.profile2))
+
+    def test_rebuild_reloads_friend_sets(self):
+        self.profile1.is_friend(self.profile2)
+        self.profile1.friends.add(self.profile2)
+        self.assertEqual(friends.rebuild_friend_sets(), 2)
+        self.assertTrue(self.profile1.is_friend(self.profile2))
+
+
+class FriendSuggestionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('social_network.signals.sync_timeline_friendship')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.users = {name: User.objects.create_user(username=name, password='password123')
+                      for name in ['ann', 'ben', 'cat', 'dan', 'eve']}
+        for a, b in [('ann', 'ben'), ('ann', 'dan'), ('ben', 'cat'), ('dan', 'cat'), ('ben', 'eve')]:
+            self.befriend(a, b)
+        self.client.login(username='ann', password='password123')
+
+    def befriend(self, a, b):
+        self.users[a].profile.friends.add(self.users[b].profile)
+        self.users[b].profile.friends.add(self.users[a].profile)
+
+    def test_suggests_friends_of_friends_by_mutual_count(self):
+        suggestions.compute_suggestions()
+        response = self.client.get(reverse('friend_suggestions'))
+        self.assertEqual(
+            [(s['username'], s['mutual_friends']) for s in response.data['results']],
+            [('cat', 2), ('eve', 1)],
+        )
+
+    def test_skips_people_befriended_since(self):
+        suggestions.compute_suggestions()
+        self.befriend('ann', 'cat')
+        response = self.client.get(reverse('friend_suggestions'))
+        self.assertEqual([s['username'] for s in response.data['results']], ['eve'])
+
+
+    def test_recompute_deletes_suggestions_without_candidates(self):
+        suggestions.compute_suggestions()
+        for friend in ['ben', 'dan']:
+            self.users['ann'].profile.friends.remove(self.users[friend].profile)
+            self.users[friend].profile.friends.remove(self.users['ann'].profile)
+        suggestions.compute_suggestions()
+        self.assertEqual(suggestions.get_suggestions(self.users['ann'].profile.id), [])
+
+    def test_redis_outage_returns_no_suggestions(self):
+        with mock.patch('social_network.suggestions.get_redis_connection', side_effect=RedisError):
+            response = self.client.get(reverse('friend_suggestions'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+
+class FriendGraphApiTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('social_network.signals.sync_timeline_friendship')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.users = {name: User.objects.create_user(username=name, password='password123')
+                      for name in ['ann', 'ben', 'cat', 'dan', 'eve', 'fay']}
+        for a, b in [('ann', 'ben'), ('ann', 'cat'), ('ben', 'dan'), ('cat', 'dan'), ('dan', 'eve')]:
+            self.users[a].profile.friends.add(self.users[b].profile)
+            self.users[b].profile.friends.add(self.users[a].profile)
+        self.client.login(username='ann', password='password123')
+
+    def test_mutual_friend_counts(self):
+        ids = [self.users[name].id for name in ['dan', 'eve', 'ben']]
+        response = self.client.get(reverse('mutual_friends'), {'user_ids': ','.join(map(str, ids))})
+        self.assertEqual(response.data['results'], {ids[0]: 2, ids[1]: 0, ids[2]: 0})
+
+    def test_mutual_friend_counts_without_redis(self):
+        profile_ids = [self.users['dan'].profile.id, self.users['eve'].profile.id]
+        with mock.patch('social_network.friends.get_redis_connection', side_effect=RedisError):
+            counts = friends.mutual_friend_counts(self.users['ann'].profile.id, profile_ids)
+        self.assertEqual(counts, {profile_ids[0]: 2, profile_ids[1]: 0})
+
+    def test_mutual_friends_rejects_too_many_ids(self):
+        response = self.client.get(reverse('mutual_friends'), {'user_ids': ','.join(['1'] * 101)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_connection_path(self):
+        response = self.client.get(reverse('friend_connection', args=[self.users['eve'].id]))
+        self.assertEqual(response.data['degrees'], 3)
+        usernames = [step['username'] for step in response.data['path']]
+        self.assertEqual((usernames[0], usernames[2:]), ('ann', ['dan', 'eve']))
+
+    def test_connection_path_respects_depth_cap(self):
+        source, target = self.users['ann'].profile.id, self.users['eve'].profile.id
+        self.assertEqual(friends.connection_path(source, target, max_depth=2), (None, True))
+        response = self.client.get(reverse('friend_connection', args=[self.users['fay'].id]))
+        self.assertEqual((response.data['path'], response.data['exhausted']), (None, False))
+
+
+class BulkFriendOperationsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('social_network.signals.sync_timeline_friendship')
+        self.sync_timeline = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user(username='ann', password='password123')
+        self.others = [User.objects.create_user(username=f'user{i}', password='password123') for i in range(3)]
+        self.requests = [FriendRequest.objects.create(from_user=other, to_user=self.user) for other in self.others]
+        self.client.login(username='ann', password='password123')
+
+    def test_bulk_accept_makes_friendships_both_ways(self):
+        ids = [friend_request.id for friend_request in self.requests] + [999]
+        with self.captureOnCommitCallbacks(execute=True):
+            accepted = friend_requests.accept_friend_requests(self.user, ids)
+        self.assertCountEqual(accepted, ids[:3])
+        self.assertFalse(FriendRequest.objects.exists())
+        for other in self.others:
+            self.assertTrue(self.user.profile.is_friend(other.profile))
+            self.assertTrue(other.profile.is_friend(self.user.profile))
+
+    def test_bulk_accept_writes_notification_events(self):
+        response = self.client.post(
+            reverse('bulk_accept_friend_requests'),
+            {'request_ids': [friend_request.id for friend_request in self.requests]}, format='json',
+        )
+        self.assertEqual(len(response.data['accepted']), 3)
+        recipients = NotificationEvent.objects.filter(verb='accepted your friend request').values_list('recipient_id', flat=True)
+        self.assertCountEqual(recipients, [other.id for other in self.others])
+
+    def test_accept_and_remove_update_both_timelines(self):
+        self.sync_timeline.delay.side_effect = sync_timeline_friendship
+        friend = self.others[0]
+        own_post = Post.objects.create(title='Mine', content='Content', author=self.user)
+        friend_post = Post.objects.create(title='Theirs', content='Content', author=friend)
+        # Materialize both timelines so they are updated in place rather than rebuilt.
+        feed.get_home_feed(self.user)
+        feed.get_home_feed(friend)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            friend_requests.accept_friend_requests(self.user, [self.requests[0].id])
+        self.assertIn(friend_post, feed.get_home_feed(self.user)[0])
+        self.assertIn(own_post, feed.get_home_feed(friend)[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            friend_requests.remove_friends(self.user, [friend.profile.id])
+        self.assertEqual(feed.get_home_feed(self.user)[0], [own_post])
+        self.assertEqual(feed.get_home_feed(friend)[0], [friend_post])
+
+    def test_bulk_accept_query_count_is_independent_of_batch_size(self):
+        user = User.objects.get(pk=self.user.pk)
+        with CaptureQueriesContext(connection) as single:
+            friend_requests.accept_friend_requests(user, [self.requests[0].id])
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(len(single)):
+            friend_requests.accept_friend_requests(user, [friend_request.id for friend_request in self.requests[1:]])
+        self.assertEqual(get_profile_summary(self.user.id).pending_request_count, 0)
+
+    def test_bulk_reject_ignores_other_users_requests(self):
+        foreign = FriendRequest.objects.create(from_user=self.others[0], to_user=self.others[1])
+        response = self.client.post(
+            reverse('bulk_reject_friend_requests'),
+            {'request_ids': [self.requests[0].id, foreign.id]}, format='json',
+        )
+        self.assertEqual(response.data['rejected'], [self.requests[0].id])
+        self.assertTrue(FriendRequest.objects.filter(pk=foreign.id).exists())
+
+    def test_bulk_remove_friends(self):
+        friend_requests.accept_friend_requests(self.user, [friend_request.id for friend_request in self.requests])
+        profile_ids = [other.profile.id for other in self.others[:2]]
+        response = self.client.post(reverse('bulk_remove_friends'), {'profile_ids': profile_ids}, format='json')
+        self.assertCountEqual(response.data['removed'], profile_ids)
+        self.assertEqual(list(self.user.profile.friends.all()), [self.others[2].profile])
+        self.assertFalse(self.others[0].profile.friends.exists())
+
+    def test_bulk_operations_reject_bad_input(self):
+        for body in [{}, {'request_ids': []}, {'request_ids': ['1']}, {'request_ids': list(range(1, 502))}]:
+            response = self.client.post(reverse('bulk_accept_friend_requests'), body, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProfileSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch('social_network.signals.sync_timeline_friendship')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user1 = User.objects.create_user(username='user1', password='password1')
+        self.user2 = User.objects.create_user(username='user2', password='password2')
+        self.post = Post.objects.create(title='Counted post', content='Content', author=self.user1)
+
+    def summary(self, user):
+        return ProfileSummary.objects.get(pk=user.pk)
+
+    def test_counters_follow_posts_likes_friends_and_requests(self):
+        self.post.likes.add(self.user2)
+        self.user1.profile.friends.add(self.user2.profile)
+        self.user1.profile.user_friends.add(self.user2.profile)
+        FriendRequest.objects.create(from_user=self.user2, to_user=self.user1)
+        self.assertEqual(self.summary(self.user2).friend_count, 1)
+
+        summary = self.summary(self.user1)
+        self.assertEqual(
+            (summary.post_count, summary.friend_count, summary.likes_received, summary.pending_request_count),
+            (1, 1, 1, 1),
+        )
+
+        self.user2.liked_posts.remove(self.post)
+        self.user1.profile.friends.remove(self.user2.profile, self.user1.profile)
+        FriendRequest.objects.all().delete()
+        self.post.delete()
+        summary = self.summary(self.user1)
+        self.assertEqual(
+            (summary.post_count, summary.friend_count, summary.likes_received, summary.pending_request_count),
+            (0, 0, 0, 0),
+        )
+
+    def test_cached_summary_is_invalidated_on_change(self):
+        self.assertEqual(get_profile_summary(self.user1.pk).post_count, 1)
+        with self.assertNumQueries(0):
+            get_profile_summary(self.user1.pk)
+        Post.objects.create(title='Another', content='Content', author=self.user1)
+        self.assertEqual(get_profile_summary(self.user1.pk).post_count, 2)
+
+    def test_missing_summary_is_counted_from_source_tables(self):
+        ProfileSummary.objects.filter(pk=self.user1.pk).delete()
+        self.assertEqual(get_profile_summary(self.user1.pk).post_count, 1)
+
+    def test_reconcile_repairs_drift(self):
+        ProfileSummary.objects.filter(pk=self.user1.pk).update(post_count=5, friend_count=3)
+        self.assertEqual(reconcile_profile_summaries(chunk_size=1), 1)
+        self.assertEqual((self.summary(self.user1).post_count, self.summary(self.user1).friend_count), (1, 0))
+
+    def test_profile_view_shows_summary(self):
+        self.client.login(username='user2', password='password2')
+        response = self.client.get(reverse('profile_view', args=['user1']))
+        self.assertEqual(response.context['summary'].post_count, 1)
+        self.assertEqual(response.context['friend_requests'], [])
+
+
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='password123')
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='password123') for i in range(5)]
+        self.post = Post.objects.create(title='Viral', content='Content', author=self.author)
+
+    def like(self, fan):
+        notifications.record_event(self.author.id, fan.id, 'liked your post', target=self.post, aggregate=True)
+
+    def test_events_roll_up_into_one_notification(self):
+        for fan in self.fans:
+            self.like(fan)
+        # Like/unlike spam by the same user within the window counts once.
+        self.like(self.fans[0])
+
+        self.assertEqual(notifications.drain_outbox(), 6)
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual(notification.actor, self.fans[0])
+        self.assertEqual(len(notification.recent_actors), notifications.RECENT_ACTORS)
+        self.assertEqual(notification.message, 'fan0 and 4 others liked your post')
+        self.assertEqual(notification.target, self.post)
+        self.assertFalse(NotificationEvent.objects.exists())
+
+    def test_later_events_extend_the_unread_notification(self):
+        self.like(self.fans[0])
+        notifications.drain_outbox()
+        self.like(self.fans[1])
+        self.like(self.fans[0])
+        notifications.drain_outbox(batch_size=1)
+
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual((notification.actor_count, notification.message),
+                         (2, 'fan0 and 1 other liked your post'))
+
+        Notification.objects.update(read=True)
+        self.like(self.fans[2])
+        notifications.drain_outbox()
+        self.assertEqual(Notification.objects.filter(read=False).count(), 1)
+
+    def test_events_without_aggregation_stay_separate(self):
+        for fan in self.fans[:2]:
+            notifications.record_event(self.author.id, fan.id, 'sent you a friend request')
+        notifications.record_event(self.author.id, self.author.id, 'liked your post', target=self.post, aggregate=True)
+
+        self.assertEqual(notifications.drain_outbox(), 2)
+        self.assertEqual(Notification.objects.filter(verb='sent you a friend request').count(), 2)
+
+    def test_failed_drain_keeps_events_for_retry(self):
+        self.like(self.fans[0])
+        with mock.patch.object(Notification.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                notifications.drain_outbox()
+        self.assertEqual(NotificationEvent.objects.count(), 1)
+
+        self.assertEqual(notifications.drain_outbox(), 1)
+        self.assertEqual(Notification.objects.get(recipient=self.author).actor, self.fans[0])
+
+    def test_event_is_discarded_with_a_rolled_back_transaction(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.like(self.fans[0])
+            raise RuntimeError
+        self.assertFalse(NotificationEvent.objects.exists())
+
+
+class NotificationPagingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ann', password='password123')
+        self.others = [User.objects.create_user(username=f'user{i}', password='password123') for i in range(3)]
+        self.client.login(username='ann', password='password123')
+        self.url = reverse('get_notifications')
+
+    def notify(self, count):
+        for i in range(count):
+            actor = self.others[i % len(self.others)]
+            post = Post.objects.create(title=f'Post {i}', content='Content', author=self.user)
+            comment = Comment.objects.create(post=post, author=actor, content='Nice')
+            Notification.objects.create(recipient=self.user, actor=actor, verb='liked your post', target=post)
+            Notification.objects.create(recipient=self.user, actor=actor, verb='commented on your post', target=comment)
+
+    def get_page(self, **params):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), len(queries)
+
+    def test_pages_follow_the_cursor(self):
+        self.notify(3)
+        first, _ = self.get_page(page_size=4)
+        self.assertEqual(len(first['notifications']), 4)
+        second, _ = self.get_page(page_size=4, cursor=first['next_cursor'])
+        self.assertEqual(len(second['notifications']), 2)
+        self.assertIsNone(second['next_cursor'])
+        ids = [n['id'] for n in first['notifications'] + second['notifications']]
+        self.assertEqual(ids, list(Notification.objects.order_by('-timestamp', '-id').values_list('id', flat=True)))
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.notify(1)
+        _, few = self.get_page()
+        self.notify(5)
+        data, many = self.get_page()
+        self.assertEqual(len(data['notifications']), 12)
+        self.assertEqual(many, few)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_mark_read(self):
+        self.notify(2)
+        ids = list(Notification.objects.values_list('id', flat=True)[:2])
+        response = self.client.post(reverse('mark_notifications_as_read'), {'ids': ids}, format='json')
+        self.assertEqual(response.json(), {'marked': 2})
+        self.assertEqual(Notification.objects.filter(read=False).count(), 2)
+
+        response = self.client.post(reverse('mark_notifications_as_read'), {'all': True}, format='json')
+        self.assertEqual(response.json(), {'marked': 2})
+        self.assertFalse(Notification.objects.filter(read=False).exists())
+
+        response = self.client.post(reverse('mark_notifications_as_read'), {'ids': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_marking_another_users_notification_is_not_found(self):
+        notification = Notification.objects.create(recipient=self.others[0], actor=self.user, verb='liked your post')
+        response = self.client.post(reverse('mark_notification_as_read', args=[notification.id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        notification.refresh_from_db()
+        self.assertFalse(notification.read)
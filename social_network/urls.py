@@ -4,6 +4,7 @@ from .views import fbv
 urlpatterns = [
     path('home/', fbv.home, name='home'),
     path('posts/', fbv.post_list, name='post_list'),
+    path('posts/bulk/', fbv.bulk_create_posts, name='bulk_create_posts'),
     path('create_post/', fbv.create_post, name='create_post'),
     path('posts/<int:post_id>/', fbv.post_detail, name='post_detail'),
     path('posts/<int:post_id>/comments/', fbv.comment_list, name='comment_list'),
@@ -14,15 +15,25 @@ urlpatterns = [
     path('profile/<str:username>/', fbv.profile_view, name='profile_view'),
     path('profile/friends/', fbv.list_friends, name='list_friends'),
     path('search/', fbv.search_users, name='search_users'),
+    path('api/users/autocomplete/', fbv.user_autocomplete, name='user_autocomplete'),
     path('api/profile/update/', fbv.profile_update_view, name='profile_update'),
     path('api/profile/delete/', fbv.delete_profile, name='delete_profile'),
     path('send_friend_request/<int:profile_id>/', fbv.send_friend_request, name='send_friend_request'),
     path('accept_friend_request/<int:request_id>/', fbv.accept_friend_request, name='accept_friend_request'),
     path('reject_friend_request/<int:request_id>/', fbv.reject_friend_request, name='reject_friend_request'),
     path('api/profile/friends/remove/<int:profile_id>/', fbv.remove_friend, name='remove_friend'),
+    path('api/profile/friends/remove/bulk/', fbv.bulk_remove_friends, name='bulk_remove_friends'),
+    path('api/friend_requests/accept/', fbv.bulk_accept_friend_requests, name='bulk_accept_friend_requests'),
+    path('api/friend_requests/reject/', fbv.bulk_reject_friend_requests, name='bulk_reject_friend_requests'),
     path('api/profile/friends/', fbv.list_friends, name='list_friends'),
     path('api/friends/', fbv.search_friends, name='search_friends'),
+    path('api/friends/suggestions/', fbv.friend_suggestions, name='friend_suggestions'),
+    path('api/friends/mutual/', fbv.mutual_friends, name='mutual_friends'),
+    path('api/friends/connection/<int:user_id>/', fbv.friend_connection, name='friend_connection'),
     path('search-posts/', fbv.search_posts, name='search_posts'),
+    path('notifications/', fbv.get_notifications, name='get_notifications'),
+    path('notifications/<int:notification_id>/read/', fbv.mark_notification_as_read, name='mark_notification_as_read'),
+    path('notifications/read/', fbv.mark_notifications_as_read, name='mark_notifications_as_read'),
     path('login/', fbv.login_page, name='login_page'),
     path('logout/', fbv.logout_view, name='logout'),
 ]
@@ -0,0 +1,89 @@
+import logging
+import string
+import sys
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+logger = logging.getLogger('api_logger')
+
+AUTOCOMPLETE_LIMIT = 10
+SEARCH_LIMIT = 50
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _trigram_search(query, limit, include_bio):
+    """
+    Ranks users by trigram word similarity of their username, which the pg_trgm GIN
+    indexes serve without scanning auth_user.
+    """
+    match = Q(username__icontains=query) | Q(username__trigram_word_similar=query)
+    if include_bio:
+        match |= Q(profile__bio__icontains=query)
+    return list(
+        User.objects.filter(match)
+        .annotate(similarity=TrigramWordSimilarity(query, 'username'))
+        .order_by('-similarity', 'username')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def _prefix_range(prefix):
+    """
+    Returns the (low, high) bounds of the strings that start with `prefix`. `high`
+    is None when no string above the prefix exists, i.e. it is all U+10FFFF.
+    """
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return prefix, None
+    successor = ord(stem[-1]) + 1
+    if 0xD800 <= successor <= 0xDFFF:
+        # Surrogates cannot be encoded; the next code point above them is U+E000.
+        successor = 0xE000
+    return prefix, stem[:-1] + chr(successor)
+
+
+def _lower(text):
+    """
+    Lowercases `text` the way the database's LOWER() does. SQLite's only folds
+    ASCII letters, so Unicode lowercasing would miss usernames it leaves unfolded.
+    """
+    if connection.vendor == 'sqlite':
+        return text.translate(_ASCII_LOWER)
+    return text.lower()
+
+
+def _prefix_search(query, limit, include_bio):
+    """
+    Finds usernames starting with `query`, case-insensitively, for databases without
+    trigram indexes. The match is a range on LOWER(username), which the expression
+    index from migration 0022 serves. Bio matches, if wanted, fill remaining slots.
+    """
+    low, high = _prefix_range(_lower(query))
+    users = User.objects.annotate(username_lower=Lower('username')).filter(username_lower__gte=low)
+    if high is not None:
+        users = users.filter(username_lower__lt=high)
+    ids = list(users.order_by('username_lower', 'id').values_list('id', flat=True)[:limit])
+    if include_bio and len(ids) < limit:
+        ids += User.objects.filter(profile__bio__icontains=query).exclude(id__in=ids) \
+            .order_by('username').values_list('id', flat=True)[:limit - len(ids)]
+    return ids
+
+
+def find_users(query, limit=SEARCH_LIMIT, exclude_user_id=None, include_bio=False):
+    """
+    Returns up to `limit` users matching `query`, best match first, with their
+    profiles joined. Uses pg_trgm on PostgreSQL and a username prefix range elsewhere.
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    search = _trigram_search if connection.vendor == 'postgresql' else _prefix_search
+    # One extra slot, so excluding the viewer still leaves `limit` results.
+    ids = [pk for pk in search(query, limit + 1, include_bio) if pk != exclude_user_id][:limit]
+    users = User.objects.select_related('profile').in_bulk(ids)
+    return [users[pk] for pk in ids if pk in users]
@@ -1,12 +1,28 @@
+from django.db import transaction
 from django.db.models import Q
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from redis.exceptions import RedisError
 from ..models import FriendRequest, Post, Comment, PostForm, Profile, ProfileForm, Notification
-from ..serializers import PostSerializer, CommentSerializer
+from ..serializers import BulkPostSerializer, PostSerializer, PostFeedSerializer, PostSearchSerializer, CommentSerializer
+from ..pagination import InvalidCursor, MAX_PAGE_SIZE, get_page_number, get_page_size, paginate_keyset
+from ..search import MAX_SEARCH_PAGE, cached_search
+from ..user_search import AUTOCOMPLETE_LIMIT, find_users
+from ..relationships import Relationship, annotate_relationships, resolve_relationships
+from ..profile_summary import get_profile_summary
+from ..notifications import MAX_BULK_NOTIFICATIONS, mark_read
+from ..suggestions import SUGGESTION_COUNT, get_suggestions
+from ..friends import MAX_MUTUAL_TARGETS, connection_path, mutual_friend_counts
+from ..friend_requests import MAX_BULK_FRIEND_OPERATIONS, accept_friend_requests, reject_friend_requests, remove_friends
+from ..feed import get_home_feed
+from ..fragments import render_post_cards
+from ..bulk import MAX_BULK_POSTS, create_posts
+from ..caching import POSTS_GENERATION, cached_response, notifications_etag, post_etag
+from ..likes import live_like_counts, toggle_like, toggle_like_in_db
 from ..forms import ProfileUpdateForm, CommentForm, PostForm
-from ..signals import friend_request_sent, friend_request_accepted, post_liked, comment_added
+from ..signals import friend_request_sent, post_liked, comment_added
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
@@ -18,13 +34,9 @@ from django.contrib.auth.models import User
 from django.views.decorators.csrf import csrf_exempt
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_cookie
 from social_network.throttling import PostUserRateThrottle, CommentUserRateThrottle
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework.decorators import api_view, permission_classes, throttle_classes
-from django.contrib.postgres.search import SearchQuery, SearchRank
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 import logging
@@ -47,10 +59,41 @@ def login_page(request):
     return render(request, 'login.html')
 
 
+cursor_param = openapi.Parameter(
+    'cursor',
+    openapi.IN_QUERY,
+    description="Opaque cursor returned as next_cursor by the previous page",
+    type=openapi.TYPE_STRING,
+)
+page_size_param = openapi.Parameter(
+    'page_size',
+    openapi.IN_QUERY,
+    description=f"Number of items per page (max {MAX_PAGE_SIZE})",
+    type=openapi.TYPE_INTEGER,
+)
+
+
+def _with_live_like_counts(data):
+    """
+    Replaces the like counts of a cached post list with the live ones buffered in
+    Redis, as the post cards do, so flushing likes need not invalidate every list.
+    """
+    results = data.get('results', [])
+    try:
+        counts = live_like_counts([post['id'] for post in results])
+    except RedisError as e:
+        logger.error(f"Could not read live like counts for the post list: {e}")
+        return data
+    for post in results:
+        post['like_count'] = counts.get(post['id'], post['like_count'])
+    return data
+
+
 @swagger_auto_schema(
     method='get',
-    responses={200: PostSerializer(many=True)},
-    operation_description="Retrieve a list of posts."
+    manual_parameters=[cursor_param, page_size_param],
+    responses={200: PostFeedSerializer(many=True), 400: "Invalid cursor"},
+    operation_description="Retrieve a page of posts, newest first."
 )
 @swagger_auto_schema(
     method='post',
@@ -60,15 +103,22 @@ def login_page(request):
 )
 
 @api_view(['GET', 'POST'])
-@method_decorator(cache_page(60*15))  # Cache for 15 minutes
-@method_decorator(vary_on_cookie)
 @throttle_classes([PostUserRateThrottle])
+@cached_response(POSTS_GENERATION, overlay=_with_live_like_counts)
 def post_list(request):
     if request.method == 'GET':
-        posts = Post.objects.all()
+        try:
+            posts, next_cursor = paginate_keyset(
+                Post.objects.for_feed(),
+                cursor=request.GET.get('cursor'),
+                page_size=get_page_size(request),
+            )
+        except InvalidCursor:
+            logger.warning(f"User {request.user} requested the post list with an invalid cursor.")
+            return Response({"error": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
         logger.info(f"User {request.user} accessed the post list.")
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        serializer = PostFeedSerializer(posts, many=True)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor}, status=status.HTTP_200_OK)
 
     elif request.method == 'POST':
         serializer = PostSerializer(data=request.data)
@@ -82,6 +132,32 @@ def post_list(request):
     
 
 
+@swagger_auto_schema(
+    method='post',
+    request_body=BulkPostSerializer(many=True),
+    responses={201: PostSerializer(many=True), 400: "Bad Request"},
+    operation_description=f"Create up to {MAX_BULK_POSTS} posts in one request."
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@throttle_classes([PostUserRateThrottle])
+def bulk_create_posts(request):
+    if not isinstance(request.data, list) or not 0 < len(request.data) <= MAX_BULK_POSTS:
+        return Response(
+            {"error": f"Expected a list of 1 to {MAX_BULK_POSTS} posts."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = BulkPostSerializer(data=request.data, many=True)
+    if not serializer.is_valid():
+        logger.error(f"User {request.user} failed to bulk-create posts. Errors: {serializer.errors}")
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    posts = create_posts([Post(author=request.user, **data) for data in serializer.validated_data])
+    logger.info(f"User {request.user} bulk-created {len(posts)} posts.")
+    return Response(PostSerializer(posts, many=True).data, status=status.HTTP_201_CREATED)
+
+
 @swagger_auto_schema(
     method='get',
     responses={200: PostSerializer, 404: "Not Found"},
@@ -99,6 +175,7 @@ def post_list(request):
     operation_description="Delete a post by id."
 )
 @api_view(['GET', 'PUT', 'DELETE'])
+@condition(etag_func=post_etag)
 def post_detail(request, post_id):
     try:
         post = Post.objects.get(pk=post_id)
@@ -147,6 +224,7 @@ def post_detail(request, post_id):
 
 @api_view(['GET', 'POST'])
 @throttle_classes([CommentUserRateThrottle])
+@condition(etag_func=post_etag)
 def comment_list(request, post_id):
     try:
         post = Post.objects.get(pk=post_id)
@@ -154,9 +232,17 @@ def comment_list(request, post_id):
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     if request.method == 'GET':
-        comments = post.comments.all()
+        try:
+            comments, next_cursor = paginate_keyset(
+                post.comments.select_related('author__profile'),
+                cursor=request.GET.get('cursor'),
+                page_size=get_page_size(request),
+            )
+        except InvalidCursor:
+            logger.warning(f"User {request.user} requested comments of post {post_id} with an invalid cursor.")
+            return Response({"error": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
         serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        return Response({'results': serializer.data, 'next_cursor': next_cursor})
 
     elif request.method == 'POST':
         serializer = CommentSerializer(data=request.data)
@@ -176,27 +262,25 @@ def comment_list(request, post_id):
 @login_required(login_url='/social_network/login/')
 def like_post(request, post_id):
     try:
-        post = Post.objects.get(id=post_id)
+        post = Post.objects.only('id', 'author_id').get(id=post_id)
     except Post.DoesNotExist:
         logger.error(f"Post with ID {post_id} not found for liking.")
         raise Http404("Post does not exist")
 
     user = request.user
-    if user in post.likes.all():
-        post.likes.remove(user)
-        logger.info(f"User {user} unliked post {post_id}.")
-        liked = False
-    else:
-        post.likes.add(user)
-        logger.info(f"User {user} liked post {post_id}.")
-        liked = True
+    try:
+        liked, total_likes = toggle_like(post.id, user.id)
+    except RedisError as e:
+        logger.error(f"Like buffer unavailable for post {post_id}, writing to the database: {e}")
+        liked, total_likes = toggle_like_in_db(post, user)
+    logger.info(f"User {user} {'liked' if liked else 'unliked'} post {post_id}.")
 
     if liked:
         post_liked.send(sender=Post, post=post, user=request.user)
 
     data = {
         'liked': liked,
-        'total_likes': post.total_likes(),
+        'total_likes': total_likes,
     }
     return JsonResponse(data)
 
@@ -270,12 +354,12 @@ def add_comment(request, pk):
             comment.author = request.user
             comment.save()
             logger.info(f"User {request.user.username} added a comment to post {post.pk}.")
+            comment_added.send(sender=Comment, post=post, user=request.user, comment=comment)
             return redirect('post_detail', pk=post.pk)
         else:
             logger.warning(f"User {request.user.username} failed to add a comment. Errors: {form.errors}")
     else:
         form = CommentForm()
-    comment_added.send(sender=Comment, post=post, user=request.user, comment=form)
     return render(request, 'posts/create_comment.html', {'form': form})
 
 
@@ -351,10 +435,9 @@ def send_friend_request(request, profile_id):
                 f"User {request.user.username} already sent a friend request to user {to_user_profile.user.username}.")
             return JsonResponse({"message": "Friend request already sent"}, status=400)
 
-        friend_request = FriendRequest(from_user=request.user, to_user=to_user_profile.user)
-        friend_request.save()
-
-        friend_request_sent.send(sender=FriendRequest, from_user=request.user, to_user=to_user_profile.user)
+        with transaction.atomic():
+            FriendRequest.objects.create(from_user=request.user, to_user=to_user_profile.user)
+            friend_request_sent.send(sender=FriendRequest, from_user=request.user, to_user=to_user_profile.user)
         logger.info(f"Friend request sent from {request.user.username} to {to_user_profile.user.username}.")
 
         return JsonResponse({"message": "Friend request sent successfully"}, status=201)
@@ -375,24 +458,11 @@ def send_friend_request(request, profile_id):
 @api_view(['POST'])
 @login_required
 def accept_friend_request(request, request_id):
-    try:
-        logger.info(f"User {request.user.username} is accepting a friend request with ID {request_id}")
-        friend_request = FriendRequest.objects.get(pk=request_id, to_user=request.user)
-        from_user = friend_request.from_user
-
-        request.user.profile.friends.add(from_user.profile)
-        from_user.profile.friends.add(request.user.profile)
-
-        friend_request_accepted.send(sender=FriendRequest, from_user=from_user, to_user=request.user)
-
-        friend_request.delete()
-
-        logger.info(f"User {request.user.username} and {from_user.username} are now friends.")
-
-        return JsonResponse({'message': 'Friend request accepted successfully'}, status=200)
-    except FriendRequest.DoesNotExist:
+    logger.info(f"User {request.user.username} is accepting a friend request with ID {request_id}")
+    if not accept_friend_requests(request.user, [request_id]):
         logger.error(f"Friend request with ID {request_id} not found for user {request.user.username}.")
         return JsonResponse({'error': 'Friend request does not exist'}, status=404)
+    return JsonResponse({'message': 'Friend request accepted successfully'}, status=200)
 
 
 @swagger_auto_schema(
@@ -403,16 +473,11 @@ def accept_friend_request(request, request_id):
 @api_view(['POST'])
 @login_required
 def reject_friend_request(request, request_id):
-    try:
-        logger.info(f"User {request.user.username} is rejecting a friend request with ID {request_id}")
-        friend_request = FriendRequest.objects.get(id=request_id, to_user=request.user)
-        friend_request.delete()
-
-        logger.info(f"User {request.user.username} rejected a friend request with ID {request_id}.")
-        return JsonResponse({"message": "Friend request rejected"}, status=200)
-    except FriendRequest.DoesNotExist:
+    logger.info(f"User {request.user.username} is rejecting a friend request with ID {request_id}")
+    if not reject_friend_requests(request.user, [request_id]):
         logger.error(f"Friend request with ID {request_id} not found for user {request.user.username}.")
         return JsonResponse({"message": "Friend request not found"}, status=404)
+    return JsonResponse({"message": "Friend request rejected"}, status=200)
 
 
 @swagger_auto_schema(
@@ -423,55 +488,111 @@ def reject_friend_request(request, request_id):
 @api_view(['DELETE'])
 @login_required
 def remove_friend(request, profile_id):
-    try:
-        friend_profile = Profile.objects.get(pk=profile_id)
-        user_profile = request.user.profile
+    if not Profile.objects.filter(pk=profile_id).exists():
+        logger.error(f"Profile with ID {profile_id} not found while attempting to remove friend.")
+        return JsonResponse({"message": "Profile not found"}, status=404)
 
-        if not user_profile.is_friend(friend_profile):
-            logger.warning(f"User {request.user.username} attempted to remove a non-existent friend relationship with profile ID {profile_id}.")
-            return JsonResponse({"message": "You are not friends with this user"}, status=400)
+    if not remove_friends(request.user, [profile_id]):
+        logger.warning(f"User {request.user.username} attempted to remove a non-existent friend relationship with profile ID {profile_id}.")
+        return JsonResponse({"message": "You are not friends with this user"}, status=400)
+    return JsonResponse({"message": "Friend removed successfully"}, status=200)
 
-        user_profile.friends.remove(friend_profile)
-        friend_profile.friends.remove(user_profile)
 
-        FriendRequest.objects.filter(from_user=request.user, to_user=friend_profile.user).delete()
-        FriendRequest.objects.filter(from_user=friend_profile.user, to_user=request.user).delete()
+def _get_id_list(request, field, maximum=MAX_BULK_FRIEND_OPERATIONS):
+    """
+    Returns the ids listed under `field` in the request body, or None unless they are
+    1 to `maximum` integers.
+    """
+    ids = request.data.get(field) if isinstance(request.data, dict) else None
+    if not isinstance(ids, list) or not 0 < len(ids) <= maximum:
+        return None
+    if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+        return None
+    return ids
 
-        logger.info(f"User {request.user.username} removed friend {friend_profile.user.username}.")
-        return JsonResponse({"message": "Friend removed successfully"}, status=200)
-    except Profile.DoesNotExist:
-        logger.error(f"Profile with ID {profile_id} not found while attempting to remove friend.")
-        return JsonResponse({"message": "Profile not found"}, status=404)
+
+def _id_list_schema(field, description):
+    return openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        required=[field],
+        properties={field: openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER), description=description)},
+    )
+
+
+@swagger_auto_schema(
+    method='post',
+    request_body=_id_list_schema('request_ids', f"Ids of received friend requests (at most {MAX_BULK_FRIEND_OPERATIONS})"),
+    responses={200: "Ids of the accepted requests", 400: "Bad Request"},
+    operation_description="Accept several received friend requests in one transaction."
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_accept_friend_requests(request):
+    request_ids = _get_id_list(request, 'request_ids')
+    if request_ids is None:
+        return Response(
+            {"error": f"Expected 'request_ids' to be a list of 1 to {MAX_BULK_FRIEND_OPERATIONS} ids."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response({'accepted': accept_friend_requests(request.user, request_ids)})
+
+
+@swagger_auto_schema(
+    method='post',
+    request_body=_id_list_schema('request_ids', f"Ids of received friend requests (at most {MAX_BULK_FRIEND_OPERATIONS})"),
+    responses={200: "Ids of the rejected requests", 400: "Bad Request"},
+    operation_description="Reject several received friend requests in one transaction."
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_reject_friend_requests(request):
+    request_ids = _get_id_list(request, 'request_ids')
+    if request_ids is None:
+        return Response(
+            {"error": f"Expected 'request_ids' to be a list of 1 to {MAX_BULK_FRIEND_OPERATIONS} ids."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response({'rejected': reject_friend_requests(request.user, request_ids)})
+
+
+@swagger_auto_schema(
+    method='post',
+    request_body=_id_list_schema('profile_ids', f"Ids of friends' profiles (at most {MAX_BULK_FRIEND_OPERATIONS})"),
+    responses={200: "Ids of the removed friends' profiles", 400: "Bad Request"},
+    operation_description="Remove several friends in one transaction."
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_remove_friends(request):
+    profile_ids = _get_id_list(request, 'profile_ids')
+    if profile_ids is None:
+        return Response(
+            {"error": f"Expected 'profile_ids' to be a list of 1 to {MAX_BULK_FRIEND_OPERATIONS} ids."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response({'removed': remove_friends(request.user, profile_ids)})
 
 
 @login_required
 def list_friends(request):
     profile = request.user.profile
     search_query = request.GET.get('search', '').strip()
-    friends = profile.friends.all()
+    friends = list(profile.friends.select_related('user'))
 
-    logger.info(f"User {request.user.username} is viewing their friends list with {friends.count()} friends.")
+    logger.info(f"User {request.user.username} is viewing their friends list with {len(friends)} friends.")
 
-    friend_requests_sent = FriendRequest.objects.filter(from_user=request.user).values_list('to_user__id', flat=True)
-    logger.info(f"User {request.user.username} has sent friend requests to {len(friend_requests_sent)} users.")
+    friend_requests_received = list(FriendRequest.objects.filter(to_user=request.user).select_related('from_user'))
+    logger.info(f"User {request.user.username} has received {len(friend_requests_received)} friend requests.")
 
-    friend_requests_received = FriendRequest.objects.filter(to_user=request.user)
-    logger.info(f"User {request.user.username} has received {friend_requests_received.count()} friend requests.")
+    users = find_users(search_query, exclude_user_id=request.user.id)
+    logger.info(f"User {request.user.username} performed a search with query '{search_query}', found {len(users)} users.")
 
-    if search_query:
-        users = User.objects.filter(username__icontains=search_query).exclude(id=request.user.id)
-        logger.info(f"User {request.user.username} performed a search with query '{search_query}', found {users.count()} users.")
-    else:
-        users = User.objects.none()
-        logger.info(f"User {request.user.username} performed an empty search.")
-
-    non_friends = users.exclude(profile__in=friends)
-    logger.info(f"Found {non_friends.count()} users who are not friends.")
+    non_friends = [user for user in annotate_relationships(request.user, users) if not user.relationship.is_friend]
+    logger.info(f"Found {len(non_friends)} users who are not friends.")
 
     return render(request, 'list_friends.html', {
         'friends': friends,
         'non_friends': non_friends,
-        'friend_requests_sent': friend_requests_sent,
         'friend_requests_received': friend_requests_received,
         'search_query': search_query,
     })
@@ -483,19 +604,14 @@ def search_friends(request):
 
     logger.info(f"User {request.user.username} started a search for: {search_query}")
 
-    if search_query:
-        users = User.objects.filter(username__icontains=search_query)
-        logger.info(f"Found {users.count()} users matching the search query.")
-    else:
-        users = User.objects.all()
-        logger.info("No search query provided, returning all users.")
+    users = find_users(search_query)
+    logger.info(f"Found {len(users)} users matching the search query.")
 
-    profile = request.user.profile
-    friends = profile.friends.all()
+    friends = list(request.user.profile.friends.select_related('user'))
 
-    logger.info(f"User {request.user.username} has {friends.count()} friends.")
+    logger.info(f"User {request.user.username} has {len(friends)} friends.")
 
-    non_friends = [user for user in users if user.profile not in friends]
+    non_friends = [user for user in annotate_relationships(request.user, users) if not user.relationship.is_friend]
     logger.info(f"Found {len(non_friends)} non-friends for user {request.user.username}.")
 
     return render(request, 'list_friends.html', {
@@ -503,25 +619,162 @@ def search_friends(request):
         'non_friends': non_friends
     })
 
+page_param = openapi.Parameter(
+    'page',
+    openapi.IN_QUERY,
+    description=f"1-based page number, as returned in next_page (max {MAX_SEARCH_PAGE})",
+    type=openapi.TYPE_INTEGER,
+)
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, description="Search terms; the last word matches as a prefix", type=openapi.TYPE_STRING),
+        page_param,
+        page_size_param,
+    ],
+    responses={200: PostSearchSerializer(many=True), 400: "Page out of range"},
+    operation_description="Search posts, best match first, with highlighted snippets."
+)
 @api_view(['GET'])
 def search_posts(request):
     query = request.GET.get('q', '')
-    if not query:
-        return Response({'results': []})
-    
-    search_query = SearchQuery(query)
-    posts = Post.objects.annotate(
-        rank=SearchRank('search_vector', search_query)
-    ).filter(search_vector=search_query).order_by('-rank')
-    
-    serializer = PostSerializer(posts, many=True)
-    return Response({'results': serializer.data})
+    if not query.strip():
+        return Response({'results': [], 'next_page': None})
+
+    page = get_page_number(request)
+    if page > MAX_SEARCH_PAGE:
+        return Response(
+            {"error": f"Only the first {MAX_SEARCH_PAGE} pages of results are available."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    data = cached_search(
+        query,
+        page=page,
+        page_size=get_page_size(request),
+        serialize=lambda posts: PostSearchSerializer(posts, many=True).data,
+    )
+    return Response(data)
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('q', openapi.IN_QUERY, description="Beginning of, or close match to, a username", type=openapi.TYPE_STRING),
+        openapi.Parameter('limit', openapi.IN_QUERY, description=f"Number of suggestions (max {AUTOCOMPLETE_LIMIT})", type=openapi.TYPE_INTEGER),
+    ],
+    responses={200: "Ranked username suggestions"},
+    operation_description="Suggest users for a partially typed username."
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def user_autocomplete(request):
+    limit = get_page_size(request, default=AUTOCOMPLETE_LIMIT, maximum=AUTOCOMPLETE_LIMIT, param='limit')
+    users = find_users(request.GET.get('q', ''), limit=limit, exclude_user_id=request.user.id)
+    return Response({'results': [
+        {
+            'id': user.id,
+            'username': user.username,
+            'profile_id': user.profile.id,
+            'image': user.profile.image.url if user.profile.image else None,
+        }
+        for user in users
+    ]})
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('limit', openapi.IN_QUERY, description=f"Number of suggestions (max {SUGGESTION_COUNT})", type=openapi.TYPE_INTEGER),
+    ],
+    responses={200: "Suggested users, most mutual friends first"},
+    operation_description="People you may know, from the last friend-graph computation."
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def friend_suggestions(request):
+    limit = get_page_size(request, default=SUGGESTION_COUNT, maximum=SUGGESTION_COUNT, param='limit')
+    mutual_counts = dict(get_suggestions(request.user.profile.id))
+    profiles = Profile.objects.select_related('user').in_bulk(mutual_counts.keys())
+    relationships = resolve_relationships(request.user, [profile.user_id for profile in profiles.values()])
+
+    # Suggestions are computed offline; skip people befriended or invited since.
+    results = []
+    for profile_id, mutual_friends in mutual_counts.items():
+        profile = profiles.get(profile_id)
+        if profile is None:
+            continue
+        relationship = relationships[profile.user_id]
+        if relationship.is_friend or relationship.request_sent or relationship.request_received:
+            continue
+        results.append({
+            'profile_id': profile.id,
+            'user_id': profile.user_id,
+            'username': profile.user.username,
+            'image': profile.image.url if profile.image else None,
+            'mutual_friends': mutual_friends,
+        })
+        if len(results) == limit:
+            break
+    return Response({'results': results})
+
+
+@swagger_auto_schema(
+    method='get',
+    manual_parameters=[
+        openapi.Parameter('user_ids', openapi.IN_QUERY, description=f"Comma-separated user ids (at most {MAX_MUTUAL_TARGETS})", type=openapi.TYPE_STRING),
+    ],
+    responses={200: "Mutual friend count per user id", 400: "Bad Request"},
+    operation_description="Count the friends the current user shares with each of the given users."
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def mutual_friends(request):
+    try:
+        user_ids = [int(user_id) for user_id in request.GET.get('user_ids', '').split(',') if user_id.strip()]
+    except ValueError:
+        return Response({"error": "user_ids must be comma-separated integers."}, status=status.HTTP_400_BAD_REQUEST)
+    if len(user_ids) > MAX_MUTUAL_TARGETS:
+        return Response({"error": f"At most {MAX_MUTUAL_TARGETS} user ids per request."}, status=status.HTTP_400_BAD_REQUEST)
+
+    profile_ids = dict(Profile.objects.filter(user_id__in=user_ids).values_list('id', 'user_id'))
+    counts = mutual_friend_counts(request.user.profile.id, profile_ids.keys())
+    return Response({'results': {profile_ids[profile_id]: count for profile_id, count in counts.items()}})
+
+
+@swagger_auto_schema(
+    method='get',
+    responses={200: "Shortest chain of friends to the user, or null", 404: "Not Found"},
+    operation_description="Find how the current user is connected to another user through friends."
+)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def friend_connection(request, user_id):
+    target = get_object_or_404(Profile, user_id=user_id)
+    path, exhausted = connection_path(request.user.profile.id, target.id)
+    if path is None:
+        logger.info(f"No connection found from {request.user.username} to user {user_id} (search exhausted: {exhausted}).")
+        return Response({'path': None, 'degrees': None, 'exhausted': exhausted})
+
+    profiles = Profile.objects.select_related('user').in_bulk(path)
+    return Response({
+        'path': [{'user_id': profiles[pk].user_id, 'username': profiles[pk].user.username} for pk in path],
+        'degrees': len(path) - 1,
+        'exhausted': False,
+    })
+
 
 @login_required(login_url='/social_network/login/')
 def home(request):
-    posts = Post.objects.all()
-    logger.info(f"User {request.user.username} accessed the home page and viewed {posts.count()} posts.")
-    return render(request, 'home.html', {'posts': posts})
+    try:
+        posts, next_cursor = get_home_feed(request.user, cursor=request.GET.get('cursor'), page_size=get_page_size(request))
+    except InvalidCursor:
+        logger.warning(f"User {request.user.username} requested the home page with an invalid cursor.")
+        return redirect('home')
+    cards = render_post_cards(posts, request)
+    logger.info(f"User {request.user.username} accessed the home page and viewed {len(posts)} posts.")
+    return render(request, 'home.html', {'posts': posts, 'cards': cards, 'next_cursor': next_cursor})
 
 
 def logout_view(request):
@@ -552,17 +805,37 @@ def create_post(request):
 
 @login_required(login_url='/social_network/login/')
 def profile_view(request, username):
-    user_profile = get_object_or_404(Profile, user__username=username)
-    friend_requests = FriendRequest.objects.filter(to_user=request.user)
+    user_profile = get_object_or_404(Profile.objects.select_related('user'), user__username=username)
+    summary = get_profile_summary(user_profile.user_id)
+
+    if user_profile.user_id == request.user.id:
+        # Only the owner sees the requests, and only when there are any to list.
+        friend_requests = FriendRequest.objects.filter(to_user=request.user).select_related('from_user') \
+            if summary.pending_request_count else []
+        relationship = Relationship()
+    else:
+        friend_requests = []
+        relationship = resolve_relationships(request.user, [user_profile.user_id])[user_profile.user_id]
+    logger.info(f"User {request.user.username} viewed the profile of {username}. Sent request: {relationship.request_sent}, Is friend: {relationship.is_friend}")
 
-    sent_request = FriendRequest.objects.filter(from_user=request.user, to_user=user_profile.user).exists()
-    logger.info(f"User {request.user.username} viewed the profile of {username}. Sent request: {sent_request}, Is friend: {request.user.profile.is_friend(user_profile)}")
+    try:
+        posts, next_cursor = paginate_keyset(
+            Post.objects.for_feed().filter(author=user_profile.user),
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request),
+        )
+    except InvalidCursor:
+        return redirect('profile_view', username=username)
 
     return render(request, 'profile.html', {
         'user_profile': user_profile,
+        'summary': summary,
         'friend_requests': friend_requests,
-        'is_friend': request.user.profile.is_friend(user_profile),
-        'sent_request': sent_request,
+        'is_friend': relationship.is_friend,
+        'sent_request': relationship.request_sent,
+        'posts': posts,
+        'cards': render_post_cards(posts, request),
+        'next_cursor': next_cursor,
     })
 
 
@@ -613,23 +886,29 @@ def delete_post(request, post_id):
 
 @swagger_auto_schema(
     method='get',
-    operation_description="Retrieve unread notifications for the authenticated user.",
+    operation_description="Retrieve unread notifications for the authenticated user, newest first.",
+    manual_parameters=[cursor_param, page_size_param],
     responses={
         200: openapi.Response(
-            description="List of unread notifications.",
+            description="A page of unread notifications.",
             examples={
                 "application/json": {
                     "notifications": [
                         {
                             "id": 1,
                             "actor": "john_doe",
-                            "verb": "sent you a friend request",
+                            "verb": "liked your post",
+                            "actor_count": 42,
+                            "message": "john_doe and 41 others liked your post",
+                            "target": "My first post",
                             "timestamp": "2024-11-26 12:34:56",
                         },
-                    ]
+                    ],
+                    "next_cursor": None,
                 }
             }
         ),
+        400: openapi.Response(description="Invalid cursor"),
         401: openapi.Response(description="Unauthorized"),
     },
     security=[{'Token': []}],
@@ -637,24 +916,39 @@ def delete_post(request, post_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 @login_required
+@condition(etag_func=notifications_etag)
 def get_notifications(request):
     """
         Retrieve unread notifications for the authenticated user.
 
-        Returns a list of unread notifications with details.
+        Returns a page of unread notifications with details. Actors are joined and
+        targets are loaded with one query per target type.
     """
-    notifications = request.user.notifications.filter(read=False)
+    notifications = request.user.notifications.filter(read=False).select_related('actor').prefetch_related('target')
+    try:
+        notifications, next_cursor = paginate_keyset(
+            notifications,
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request),
+            field='timestamp',
+        )
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
     data = {
         'notifications': [
             {
                 'id': n.id,
                 'actor': n.actor.username,
                 'verb': n.verb,
+                'actor_count': n.actor_count,
+                'message': n.message,
                 'target': str(n.target) if n.target else None,
                 'timestamp': n.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
             }
             for n in notifications
-        ]
+        ],
+        'next_cursor': next_cursor,
     }
     logger.info(f"User {request.user.username} retrieved notifications.")
     return JsonResponse(data)
@@ -698,30 +992,63 @@ def mark_notification_as_read(request, notification_id):
 
         Returns a success message if the operation was successful.
     """
-    try:
-        notification = Notification.objects.get(id=notification_id, recipient=request.user)
-        notification.read = True
-        notification.save()
-        logger.info(f"Notification {notification_id} marked as read by user {request.user.username}.")
-        return JsonResponse({'success': True})
-    except Notification.DoesNotExist:
+    if not mark_read(request.user.id, [notification_id]) \
+            and not Notification.objects.filter(id=notification_id, recipient=request.user).exists():
         logger.warning(f"Notification {notification_id} not found for user {request.user.username}.")
         return JsonResponse({'success': False}, status=404)
+    logger.info(f"Notification {notification_id} marked as read by user {request.user.username}.")
+    return JsonResponse({'success': True})
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_description="Mark all unread notifications, or the listed ones, as read with one update.",
+    request_body=openapi.Schema(
+        type=openapi.TYPE_OBJECT,
+        properties={
+            'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER), description=f"Notification ids (at most {MAX_BULK_NOTIFICATIONS})"),
+            'all': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Mark every unread notification instead"),
+        },
+    ),
+    responses={
+        200: openapi.Response(description="Number of notifications marked.", examples={"application/json": {"marked": 3}}),
+        400: openapi.Response(description="Bad Request"),
+        401: openapi.Response(description="Unauthorized"),
+    },
+    security=[{'Token': []}],
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_notifications_as_read(request):
+    if isinstance(request.data, dict) and request.data.get('all') is True:
+        notification_ids = None
+    else:
+        notification_ids = _get_id_list(request, 'ids', maximum=MAX_BULK_NOTIFICATIONS)
+        if notification_ids is None:
+            return Response(
+                {"error": f"Expected 'all': true or 'ids' as a list of 1 to {MAX_BULK_NOTIFICATIONS} ids."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+    marked = mark_read(request.user.id, notification_ids)
+    logger.info(f"User {request.user.username} marked {marked} notifications as read.")
+    return Response({'marked': marked})
 
 
 @login_required
 def search_users(request):
     query = request.GET.get('q', '')
-    users = User.objects.filter(Q(username__icontains=query) | Q(profile__bio__icontains=query)).exclude(id=request.user.id)
+    users = find_users(query, exclude_user_id=request.user.id, include_bio=True)
+    relationships = resolve_relationships(request.user, [user.id for user in users])
 
-    user_statuses = []
-    for user in users:
-        status = {
+    user_statuses = [
+        {
             'user': user,
-            'is_friend': user.profile in request.user.profile.friends.all(),
-            'request_sent': FriendRequest.objects.filter(from_user=request.user, to_user=user).exists()
+            'is_friend': relationships[user.id].is_friend,
+            'request_sent': relationships[user.id].request_sent,
         }
-        user_statuses.append(status)
+        for user in users
+    ]
 
     return render(request, 'search_users.html', {
         'query': query,
@@ -0,0 +1,84 @@
+// Live unread counts and notifications: a WebSocket stream of pushed changes, with a
+// long-poll fallback when the socket cannot be kept open.
+(function() {
+    const state = { unreadCount: 0, notificationsUnread: 0, version: null };
+    let socketFailures = 0;
+
+    function render() {
+        const unreadBadge = document.getElementById('unread-badge');
+        if (!unreadBadge) {
+            return;
+        }
+        if (state.unreadCount > 0) {
+            unreadBadge.textContent = state.unreadCount;
+            unreadBadge.classList.remove('d-none');
+        } else {
+            unreadBadge.classList.add('d-none');
+        }
+    }
+
+    function applyState(data) {
+        state.unreadCount = data.unread_count;
+        state.notificationsUnread = data.notifications_unread;
+        state.version = data.version;
+        render();
+    }
+
+    function applyEvent(event) {
+        if (event.type === 'state') {
+            applyState(event);
+        } else if (event.type === 'unread.changed') {
+            state.unreadCount = Math.max(state.unreadCount + event.delta, 0);
+            render();
+        } else if (event.type === 'notification.created' || event.type === 'notification.read') {
+            state.notificationsUnread = Math.max(state.notificationsUnread + event.unread_delta, 0);
+        }
+        document.dispatchEvent(new CustomEvent('live-update', { detail: event }));
+    }
+
+    function longPoll() {
+        const query = state.version === null ? '' : `?version=${encodeURIComponent(state.version)}`;
+        fetch(`/chat/updates/poll/${query}`, { credentials: 'same-origin' })
+            .then(response => {
+                if (response.status === 401 || response.status === 403) {
+                    // Signed out: retrying cannot succeed until the page is reloaded.
+                    return null;
+                }
+                if (!response.ok) {
+                    throw new Error(`HTTP error! Status: ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => {
+                if (data === null) {
+                    return;
+                }
+                applyEvent(Object.assign({ type: 'state' }, data));
+                longPoll();
+            })
+            .catch(() => setTimeout(longPoll, 5000));
+    }
+
+    function connect() {
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${scheme}://${window.location.host}/ws/notifications/`);
+        socket.onopen = () => { socketFailures = 0; };
+        socket.onmessage = message => applyEvent(JSON.parse(message.data));
+        socket.onclose = () => {
+            socketFailures += 1;
+            if (socketFailures >= 3) {
+                longPoll();
+            } else {
+                setTimeout(connect, 1000 * socketFailures);
+            }
+        };
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        if ('WebSocket' in window) {
+            connect();
+        } else {
+            longPoll();
+        }
+    });
+})();
@@ -0,0 +1,159 @@
+// Like and comment handlers for post cards (home feed and profile pages)
+function buildComment(comment, defaultAvatar, since) {
+    const item = document.createElement('li');
+    item.className = 'mb-2';
+    item.innerHTML = `
+        <div class="d-flex">
+            <img src="${comment.author_image || defaultAvatar}" 
+                 class="rounded-circle me-2" width="32" height="32" alt="Profile image">
+            <div class="p-2 bg-light rounded-3 w-100">
+                <div class="d-flex justify-content-between align-items-center">
+                    <small class="fw-bold">${comment.author}</small>
+                    <small class="text-muted">${since}</small>
+                </div>
+                <p class="mb-0">${comment.content}</p>
+            </div>
+        </div>
+    `;
+    return item;
+}
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.like-button').forEach(button => {
+        button.addEventListener('click', function() {
+            const postId = this.getAttribute('data-post-id');
+            const url = `/social_network/posts/${postId}/like/`;
+            const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
+            
+            fetch(url, {
+                method: 'POST',
+                headers: {
+                    'X-CSRFToken': csrfToken,
+                    'Content-Type': 'application/json',
+                },
+                credentials: 'same-origin'
+            })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP error! Status: ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => {
+                const likesCountElement = document.getElementById(`likes-count-${postId}`);
+                likesCountElement.textContent = data.total_likes;
+                
+                // Update heart icon
+                if (data.liked) {
+                    this.querySelector('i').classList.remove('bi-heart');
+                    this.querySelector('i').classList.add('bi-heart-fill', 'text-danger');
+                } else {
+                    this.querySelector('i').classList.remove('bi-heart-fill', 'text-danger');
+                    this.querySelector('i').classList.add('bi-heart');
+                }
+            })
+            .catch(error => {
+                console.error('Error liking post:', error);
+                alert('There was an error processing your like. Please try again.');
+            });
+        });
+    });
+    
+    // Earlier comments, a page at a time, above the inline preview
+    document.querySelectorAll('.load-comments').forEach(function(button) {
+        button.addEventListener('click', function() {
+            const postId = button.getAttribute('data-post-id');
+            const cursor = encodeURIComponent(button.dataset.cursor);
+            const defaultAvatar = document.getElementById(`comment-form-${postId}`).dataset.defaultAvatar;
+
+            fetch(`/social_network/posts/${postId}/comments/?cursor=${cursor}`, {
+                credentials: 'same-origin'
+            })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP error! Status: ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(data => {
+                // Results are newest first, so each one goes above the previous.
+                const commentsList = document.getElementById(`comments-list-${postId}`);
+                data.results.forEach(comment => {
+                    const since = new Date(comment.created_at).toLocaleString();
+                    commentsList.insertBefore(buildComment(comment, defaultAvatar, since), commentsList.firstChild);
+                });
+
+                if (data.next_cursor) {
+                    button.dataset.cursor = data.next_cursor;
+                } else {
+                    button.remove();
+                }
+            })
+            .catch(error => {
+                console.error('Error loading comments:', error);
+            });
+        });
+    });
+
+    // Comment form functionality
+    document.querySelectorAll('.comment-form').forEach(function(form) {
+        form.addEventListener('submit', function(event) {
+            event.preventDefault();
+            
+            const postId = form.getAttribute('data-post-id');
+            const commentInput = document.getElementById(`comment-content-${postId}`);
+            const commentContent = commentInput.value.trim();
+            
+            if (!commentContent) {
+                return;
+            }
+            
+            const csrfToken = form.querySelector('[name=csrfmiddlewaretoken]').value;
+            
+            fetch(`/social_network/posts/${postId}/comments/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': csrfToken
+                },
+                body: JSON.stringify({
+                    content: commentContent
+                }),
+                credentials: 'same-origin'
+            })
+            .then(response => {
+                if (response.status === 201) {
+                    // Comment posted successfully
+                    return response.json();
+                } else {
+                    throw new Error('Failed to post comment');
+                }
+            })
+            .then(data => {
+                // Create a new comment element
+                const commentsList = document.getElementById(`comments-list-${postId}`);
+                
+                // Clear "No comments yet" message if it exists
+                if (commentsList.innerHTML.includes('No comments yet')) {
+                    commentsList.innerHTML = '';
+                }
+                
+                // Add the new comment to the list
+                commentsList.appendChild(buildComment(data, form.dataset.defaultAvatar, 'just now'));
+                
+                // Clear the input field
+                commentInput.value = '';
+                
+                // Update the comment count
+                const commentButton = document.querySelector(`button[data-bs-target="#comments-${postId}"]`);
+                const commentCountText = commentButton.textContent.trim();
+                const commentCount = parseInt(commentCountText.split(' ')[1] || '0') + 1;
+                commentButton.innerHTML = `<i class="bi bi-chat"></i> ${commentCount}`;
+            })
+            .catch(error => {
+                console.error('Error posting comment:', error);
+                alert('Failed to post comment. Please try again.');
+            });
+        });
+    });
+});